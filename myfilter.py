@@ -0,0 +1,184 @@
+import logging, os, re
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+
+# 这个模块会被 worker 进程导入，所以不要在这里导入 PySide6
+
+# 共享内存中分隔每一行文本的字符
+SEPARATOR = '\0'
+
+# worker 进程中已经 attach 的共享内存 {name: SharedMemory}
+_worker_buffers = {}
+
+# Python re 与 QRegularExpression（PCRE2）含义相同的写法：
+# 普通字符、转义的标点、. ^ $ | 、(...) 与 (?:...)、* + ? {m} {m,} {m,n}（以及对应的非贪婪写法）、
+# 只包含普通字符、转义的标点与范围的字符集 [...]。
+# 其余写法，比如 \d \w \b（Python 按 Unicode 匹配，PCRE2 默认只匹配 ASCII）、反向引用、(?<name>...)、
+# POSIX 字符类 [[:digit:]] 等，都交给 QRegularExpression 逐行匹配。
+_COMPATIBLE_TOKEN = re.compile(r'''
+      \\[^0-9A-Za-z]                    # 转义的标点
+    | \[\^?\]?(?:\\[^0-9A-Za-z]|[^\\\[\]])*\]   # 字符集
+    | \(\?:                             # 非捕获分组
+    | \{\d+(?:,\d*)?\}\??               # {m} {m,} {m,n}
+    | [^\\\[\]{}(]                      # 其它单个字符（包括 ( 以外的元字符）
+    | \(                                # 捕获分组
+''', re.VERBOSE)
+
+
+def compatible_pattern(pattern: str) -> bool:
+    """pattern 在 Python re 与 QRegularExpression 中的含义是否相同"""
+    pos = 0
+    while pos < len(pattern):
+        m = _COMPATIBLE_TOKEN.match(pattern, pos)
+        if m is None:
+            return False
+        if m.group().startswith('(') and pattern.startswith('(?', pos) and m.group() != '(?:':
+            return False
+        pos = m.end()
+    return True
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    shm = _worker_buffers.get(name)
+    if shm is None:
+        shm = shared_memory.SharedMemory(name=name)
+        _worker_buffers[name] = shm
+    return shm
+
+
+def _match_shared(text_name: str, mask_name: str, start: int, end: int, first_row: int, pattern: str, flags: int):
+    """在 worker 进程中执行：从共享内存 text_name 中取出 [start, end) 区间的文本逐行匹配，
+    再把结果写到共享内存 mask_name 中从 first_row 开始的字节（1 为匹配，0 为不匹配）。"""
+    if text_name not in _worker_buffers or mask_name not in _worker_buffers:
+        # 快照已经更新，关闭旧的共享内存
+        for old in _worker_buffers.values():
+            old.close()
+        _worker_buffers.clear()
+    text, mask = _attach(text_name), _attach(mask_name)
+
+    regex = re.compile(pattern, flags)
+    lines = bytes(text.buf[start:end]).decode('utf-8').split(SEPARATOR)
+    mask.buf[first_row:first_row + len(lines)] = bytes(1 if regex.search(line) else 0 for line in lines)
+    pass
+
+
+class ParallelFilterExecutor(object):
+    """把各个任务组的搜索文本分发到多个进程中并行匹配。
+
+    纯 Python 的正则匹配受 GIL 限制，线程池没有意义，所以使用进程池。
+    任务组的文本快照由 set_groups() 写入一块共享内存，每次搜索只需要向 worker 发送
+    (共享内存名, 区间, pattern)，不用重复传输文本。匹配结果也写在共享内存里（每行一个字节），
+    不需要把匹配的行号逐个 pickle 回来。
+
+    以下情况 match() 返回 None，由调用者自己用 QRegularExpression 逐行匹配：
+    总行数少于 min_rows（进程通信的开销比匹配本身还大）、只有一个 worker，
+    或者 pattern 在 Python re 中的含义与 QRegularExpression 不同（见 compatible_pattern()）。
+    """
+    def __init__(self, max_workers: int = None, min_rows: int = 20000):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.logger.debug('Init a %s instance' % self.__class__.__name__)
+
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.min_rows = min_rows
+
+        self.groups = []
+        self.total_rows = 0
+        # 文本与匹配结果的共享内存，以及每一块文本的区间 [(起始行号, start, end), ...]。
+        # 行号是把所有任务组连起来之后的行号。
+        # 一个很大的任务组会被切分成多块，这样任务组数量少于 CPU 核数时也能用上所有 worker
+        self.shm = None
+        self.mask_shm = None
+        self.chunks = []
+        # 进程池在第一次需要并行匹配时才创建
+        self.pool = None
+        pass
+
+    def set_groups(self, groups: list):
+        """设置文本快照。
+
+        Args:
+            groups (list): 每个任务组一个列表 [[任务组文本, 任务1文本, 任务2文本, ...], ...]
+        """
+        # 每一行文本用 SEPARATOR 分隔，所以行内的 SEPARATOR 要先去掉
+        self.groups = [[text.replace(SEPARATOR, '') for text in group] for group in groups]
+        self.total_rows = sum(len(group) for group in self.groups)
+        self.__release_buffer()
+        pass
+
+    def match(self, pattern: str, ignore_case: bool = True):
+        """对所有任务组执行匹配
+
+        Args:
+            pattern (str): 正则表达式
+            ignore_case (bool, optional): 是否忽略大小写
+
+        Returns:
+            list | None: 每个任务组一个 bytes，第 i 个字节为 1 表示第 i 行匹配（0 为任务组本身，1 开始为任务）。
+                不适合由 executor 匹配时返回 None。
+        """
+        if self.total_rows < self.min_rows or self.max_workers < 2 or not compatible_pattern(pattern):
+            return None
+        flags = re.IGNORECASE if ignore_case else 0
+        try:
+            re.compile(pattern, flags)
+        except re.error:
+            # 还没输入完整的正则表达式
+            return None
+
+        if self.shm is None:
+            self.__create_buffer()
+        if self.pool is None:
+            # 使用 spawn 启动 worker，避免 fork 一个已经加载了 Qt 的进程
+            self.pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=get_context('spawn'))
+
+        futures = [self.pool.submit(_match_shared, self.shm.name, self.mask_shm.name, start, end, first_row, pattern, flags)
+                   for first_row, start, end in self.chunks]
+        for future in futures:
+            future.result()
+
+        mask = bytes(self.mask_shm.buf[:self.total_rows])
+        results = []
+        offset = 0
+        for group in self.groups:
+            results.append(mask[offset:offset + len(group)])
+            offset += len(group)
+        return results
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+        self.__release_buffer()
+        pass
+
+    def __create_buffer(self):
+        # 每个 worker 大约分到两块
+        chunk_rows = max(-(-self.total_rows // (self.max_workers * 2)), 1)
+        blobs = []
+        group_first_row = 0
+        for group in self.groups:
+            for first_row in range(0, len(group), chunk_rows):
+                blob = SEPARATOR.join(group[first_row:first_row + chunk_rows]).encode('utf-8')
+                blobs.append((group_first_row + first_row, blob))
+            group_first_row += len(group)
+
+        self.shm = shared_memory.SharedMemory(create=True, size=max(sum(len(b) for _, b in blobs), 1))
+        self.mask_shm = shared_memory.SharedMemory(create=True, size=max(self.total_rows, 1))
+        self.chunks = []
+        offset = 0
+        for first_row, blob in blobs:
+            self.shm.buf[offset:offset + len(blob)] = blob
+            self.chunks.append((first_row, offset, offset + len(blob)))
+            offset += len(blob)
+        self.logger.debug('创建共享内存 %s: %s 字节, %s 块', self.shm.name, offset, len(self.chunks))
+        pass
+
+    def __release_buffer(self):
+        for shm in (self.shm, self.mask_shm):
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+        self.shm = None
+        self.mask_shm = None
+        self.chunks = []
+        pass
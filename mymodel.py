@@ -0,0 +1,275 @@
+import logging, hashlib
+
+from PySide6 import QtCore
+from PySide6.QtGui import QStandardItem, QTextDocumentFragment
+
+# 存放搜索用纯文本（去掉 HTML 标签）的 role
+SEARCH_ROLE = QtCore.Qt.ItemDataRole.UserRole + 1
+
+# 存放预先计算好的排序键的 role。
+# QSortFilterProxyModel 的 sortRole 设置为这些 role 后，默认的 lessThan 直接在 C++ 中比较字符串/数值，
+# 不需要重写 lessThan，也不会在排序时反复解析 HTML。
+TITLE_SORT_ROLE = QtCore.Qt.ItemDataRole.UserRole + 2
+STATUS_SORT_ROLE = QtCore.Qt.ItemDataRole.UserRole + 3
+TIMESTAMP_SORT_ROLE = QtCore.Qt.ItemDataRole.UserRole + 4
+# 任务在任务组加载顺序中的位置。TaskItemModel 调整加载顺序时，用 QStandardItem.sortChildren() 按这个 role 一次排好
+LOAD_ORDER_ROLE = QtCore.Qt.ItemDataRole.UserRole + 5
+
+
+def search_text(text: str) -> str:
+    """把 item 的显示文本（可能含有 HTML 标签）转换为用于搜索的纯文本。"""
+    if '<' not in text and '&' not in text:
+        # 大部分标题都是纯文本，不用再去解析 HTML
+        return text
+    return QTextDocumentFragment.fromHtml(text).toPlainText()
+
+
+def title_sort_key(text: str) -> str:
+    """标题的排序键：去掉 HTML 标签，再统一大小写"""
+    return search_text(text).casefold()
+
+
+def task_fields(task) -> tuple:
+    """把任务数据转换为 (标题, 状态, 时间戳)。
+
+    Args:
+        task (str | tuple): 任务标题，或者 (任务标题, 状态, 时间戳)。只有标题时，状态为 0，时间戳为 0.0
+    """
+    if isinstance(task, str):
+        return task, 0, 0.0
+    title, status, timestamp = task
+    return title, status, timestamp
+
+
+class TaskRecord(object):
+    """一个任务的数据。
+
+    任务组为每个任务（包括还没有加载成 item 的）保存一个 TaskRecord，
+    搜索、排序时直接使用其中的搜索文本与排序键，不需要先把任务加载出来。
+    """
+    def __init__(self, index: int, task, search_text: str = None):
+        """
+        Args:
+            index (int): 任务在任务组中原来的序号
+            task (str | tuple): 任务数据，见 task_fields()
+            search_text (str, optional): 预先计算好的搜索文本（比如来自启动快照）
+        """
+        self.index = index
+        self.title, self.status, self.timestamp = task_fields(task)
+        # 搜索文本与标题排序键需要解析 HTML，第一次用到时才计算
+        self.__search_text = search_text
+        self.__title_key = None
+        pass
+
+    @property
+    def search_text(self) -> str:
+        if self.__search_text is None:
+            self.__search_text = search_text(self.title)
+        return self.__search_text
+
+    @property
+    def title_key(self) -> str:
+        if self.__title_key is None:
+            # 与 title_sort_key(self.title) 相同，但是可以直接使用已经算好的搜索文本
+            self.__title_key = self.search_text.casefold()
+        return self.__title_key
+
+    def sort_key(self, role: int):
+        """返回 role（TITLE_SORT_ROLE、STATUS_SORT_ROLE、TIMESTAMP_SORT_ROLE）对应的排序键"""
+        if role == TITLE_SORT_ROLE:
+            return self.title_key
+        if role == STATUS_SORT_ROLE:
+            return self.status
+        if role == TIMESTAMP_SORT_ROLE:
+            return self.timestamp
+        raise ValueError('不支持的排序 role: %s' % role)
+
+
+class DataChangedAggregator(QtCore.QObject):
+    """合并 dataChanged 信号。
+
+    QStandardItem.emitDataChanged() 每调用一次就会发射一次 dataChanged，
+    QSortFilterProxyModel 收到后会对该行重新执行 filterAcceptsRow。
+    当大量 item 在同一轮事件循环里发生变化时（比如每个 QMovie 的 frameChanged），这样做代价很高。
+
+    DataChangedAggregator 先把变化的 item 缓存起来，等到下一轮事件循环再统一处理：
+    同一父节点下行号连续的 item 合并成一个区间，每个区间只发射一次 dataChanged(topLeft, bottomRight, roles)。
+
+    只有 emitDataChanged() 会经过 aggregator，QStandardItem.setData() 在 C++ 里直接发射 dataChanged。
+    TaskInfoItem.set_status()/set_timestamp() 故意不经过这里：它们修改的是排序键，proxy 必须立即把这一行移到新位置，
+    TaskItemModel 还可能紧接着把它移出 model（见 task_sort_key_changed()），延迟发射只会让视图短暂显示错误的顺序。
+    而且这类修改很少，不需要合并。
+    """
+    def __init__(self, parent: QtCore.QObject = None):
+        super(DataChangedAggregator, self).__init__(parent)
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.logger.debug('Init a %s instance' % self.__class__.__name__)
+
+        # 缓存待发射的变化 {id(item): [item, roles]}
+        # roles 为 None 表示所有 role 都可能发生了变化（与 emitDataChanged() 一致）
+        self.pending = {}
+
+        # interval 为 0 的单次定时器：在当前事件全部处理完之后才触发 flush
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.flush)
+        pass
+
+    def post(self, item: QStandardItem, roles: list = None):
+        """登记一个发生变化的 item，延迟到下一轮事件循环再发射 dataChanged。
+
+        Args:
+            item (QStandardItem): 发生变化的 item
+            roles (list, optional): 发生变化的 role 列表。None 表示所有 role。
+        """
+        if not self.pending:
+            # 本轮事件循环中第一个变化，启动定时器
+            self.timer.start()
+
+        entry = self.pending.get(id(item))
+        if entry is None:
+            self.pending[id(item)] = [item, None if roles is None else {int(r) for r in roles}]
+        elif entry[1] is not None:
+            if roles is None:
+                entry[1] = None
+            else:
+                entry[1].update(int(r) for r in roles)
+        pass
+
+    def flush(self):
+        """把缓存的变化按 (model, 父节点) 分组，再按连续行号合并成区间，每个区间发射一次 dataChanged。"""
+        pending, self.pending = self.pending, {}
+        self.timer.stop()
+
+        groups = {}
+        for item, roles in pending.values():
+            model = item.model()
+            if model is None:
+                # item 已经被移出 model 了
+                continue
+            parent = item.parent() or model.invisibleRootItem()
+            group = groups.setdefault((id(model), id(parent)), (model, parent, {}))
+            rows = group[2]
+            row = item.row()
+            if row not in rows:
+                rows[row] = roles
+            elif rows[row] is not None:
+                rows[row] = None if roles is None else rows[row] | roles
+
+        for model, parent, rows in groups.values():
+            parent_index = parent.index()
+            last_column = max(model.columnCount(parent_index) - 1, 0)
+            run = []
+            for row in sorted(rows):
+                if run and row != run[-1] + 1:
+                    self.__emit_run(model, parent_index, last_column, run, rows)
+                    run = []
+                run.append(row)
+            if run:
+                self.__emit_run(model, parent_index, last_column, run, rows)
+        pass
+
+    def __emit_run(self, model, parent_index, last_column, run, rows):
+        roles = set()
+        for row in run:
+            if rows[row] is None:
+                # 区间内只要有一个 item 没有指定 role，整个区间就按所有 role 处理
+                roles = None
+                break
+            roles |= rows[row]
+
+        top_left = model.index(run[0], 0, parent_index)
+        bottom_right = model.index(run[-1], last_column, parent_index)
+        self.logger.debug('dataChanged 区间: rows[%s, %s] roles[%s]', run[0], run[-1], roles)
+        model.dataChanged.emit(top_left, bottom_right, [] if roles is None else sorted(roles))
+        pass
+
+
+class TreeSnapshot(object):
+    """任务树的启动快照。
+
+    保存上一次退出时的视图状态：扁平化后的任务树（已加载的每一行的层级、标题、搜索文本、行高）、
+    每个任务组所有任务（包括还没加载的）的搜索索引、搜索栏的过滤字符串，以及展开的任务组。
+    下次启动时先用快照立即显示上一次的视图，再在后台加载完整数据。完整数据直接使用快照中的搜索索引，
+    不需要再逐个解析任务标题中的 HTML。
+
+    快照使用 QDataStream 保存为二进制文件，并记录任务数据的 content_hash，
+    任务数据发生变化后快照自动失效。
+    """
+    MAGIC = 0x54565353  # 'TVSS'
+    VERSION = 2
+
+    def __init__(self, content_hash: str, rows: list = None, filter_text: str = '', expanded: list = None,
+                 search_index: list = None):
+        """
+        Args:
+            content_hash (str): 任务数据的哈希值，见 TreeSnapshot.hash_of()
+            rows (list, optional): 扁平化的任务树，每一行是 (depth, title, search_text, height)
+            filter_text (str, optional): 搜索栏的过滤字符串
+            expanded (list, optional): 展开的任务组标题
+            search_index (list, optional): 每个任务组一个列表，按任务原来的顺序保存所有任务的搜索文本
+        """
+        self.content_hash = content_hash
+        self.rows = rows or []
+        self.filter_text = filter_text
+        self.expanded = expanded or []
+        self.search_index = search_index or []
+        pass
+
+    @staticmethod
+    def hash_of(task_groups: list) -> str:
+        """计算任务数据 [(group_title, [task, ...]), ...] 的哈希值。
+        快照只保存任务的标题，所以只计算标题（task 的格式见 task_fields()）"""
+        h = hashlib.sha1()
+        for group_title, tasks in task_groups:
+            h.update(group_title.encode('utf-8') + b'\0')
+            for task in tasks:
+                h.update(b'\1' + task_fields(task)[0].encode('utf-8') + b'\0')
+        return h.hexdigest()
+
+    def save(self, path: str) -> bool:
+        # 使用 QSaveFile，写入过程中崩溃也不会留下半个快照文件
+        f = QtCore.QSaveFile(path)
+        if not f.open(QtCore.QIODevice.OpenModeFlag.WriteOnly):
+            logging.getLogger(self.__class__.__name__).warning('无法写入快照文件: %s', path)
+            return False
+
+        out = QtCore.QDataStream(f)
+        out.writeUInt32(self.MAGIC)
+        out.writeUInt32(self.VERSION)
+        out.writeQString(self.content_hash)
+        out.writeQString(self.filter_text)
+        out.writeQStringList(self.expanded)
+        out.writeUInt32(len(self.rows))
+        for depth, title, text, height in self.rows:
+            out.writeUInt8(depth)
+            out.writeQString(title)
+            out.writeQString(text)
+            out.writeInt32(height)
+        out.writeUInt32(len(self.search_index))
+        for texts in self.search_index:
+            out.writeQStringList(texts)
+        return f.commit()
+
+    @classmethod
+    def load(cls, path: str):
+        """读取快照文件。文件不存在或者格式不对时返回 None。"""
+        f = QtCore.QFile(path)
+        if not f.open(QtCore.QIODevice.OpenModeFlag.ReadOnly):
+            return None
+
+        stream = QtCore.QDataStream(f)
+        if stream.readUInt32() != cls.MAGIC or stream.readUInt32() != cls.VERSION:
+            return None
+        snapshot = cls(stream.readQString())
+        snapshot.filter_text = stream.readQString()
+        snapshot.expanded = stream.readQStringList()
+        for _ in range(stream.readUInt32()):
+            snapshot.rows.append((stream.readUInt8(), stream.readQString(), stream.readQString(), stream.readInt32()))
+        for _ in range(stream.readUInt32()):
+            snapshot.search_index.append(stream.readQStringList())
+
+        if stream.status() != QtCore.QDataStream.Status.Ok:
+            return None
+        return snapshot
@@ -1,9 +1,180 @@
-import logging, sys, os, random
+import logging, sys, os, random, time, weakref
 
 from PySide6 import QtCore
 from PySide6.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget, \
-    QLabel, QVBoxLayout, QHBoxLayout
-from PySide6.QtGui import QIcon, QMovie, QFont
+    QLabel, QVBoxLayout, QHBoxLayout, QStyle, QStyleOptionFocusRect
+from PySide6.QtGui import QIcon, QMovie, QFont, QPixmap, QColor
+
+class AnimationGovernor(QtCore.QObject):
+    """统一控制所有 TaskInfoWidget 中 gif（QMovie）的播放速度。
+
+    QMovie 默认按照 gif 自身的帧率一直播放下去，即使窗口最小化、被遮挡，或者任务行已经滚出了可见区域。
+    AnimationGovernor 定时检查一次，然后调整全局的播放速度：
+    1. 有窗口可见，且程序处于激活状态：全速播放
+    2. 有窗口可见，但程序没有焦点：以 unfocused_speed 的速度播放
+    3. 所有窗口都隐藏、最小化或者被完全遮挡：暂停
+    4. 不在可见区域内的 gif：暂停，直到它回到可见区域
+       作为子 widget 显示的（tv1、tv4），根据 widget 的 visibleRegion() 判断；
+       没有 parent、由 delegate 渲染的（tv2、tv3），根据上次检查之后 delegate 有没有绘制过它判断
+    此外，如果进程的 CPU 占用超过 cpu_budget，播放速度会逐步减半，直到回到预算以内。
+    """
+    __instance = None
+
+    @classmethod
+    def instance(cls):
+        """返回全局共享的 AnimationGovernor"""
+        if cls.__instance is None:
+            cls.__instance = cls(QApplication.instance())
+        return cls.__instance
+
+    def __init__(self, parent: QtCore.QObject = None, unfocused_speed: int = 25, cpu_budget: float = 0.25,
+                 check_interval: int = 500):
+        """
+        Args:
+            parent (QtCore.QObject, optional): 通常是 QApplication
+            unfocused_speed (int, optional): 程序没有焦点时的播放速度（百分比）
+            cpu_budget (float, optional): 允许的 CPU 占用（1.0 表示一个核满载）
+            check_interval (int, optional): 检查间隔（毫秒）
+        """
+        super(AnimationGovernor, self).__init__(parent)
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.logger.debug('Init a %s instance' % self.__class__.__name__)
+
+        self.unfocused_speed = unfocused_speed
+        self.cpu_budget = cpu_budget
+
+        # 所有注册的 movie {id(movie): movie}
+        self.movies = {}
+        # 显示 movie 的 widget {id(movie): weakref}
+        self.widgets = {}
+        # 上次检查之后被 delegate 绘制过的 movie id
+        self.painted = set()
+        # 因为不在可见区域而被暂停的 movie id
+        self.offscreen = set()
+
+        # 当前的播放速度（百分比），0 表示暂停
+        self.speed = 100
+        # CPU 预算允许的最高速度
+        self.budget_speed = 100
+        self.last_cpu_time = time.process_time()
+        self.last_wall_time = time.monotonic()
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(check_interval)
+        self.timer.timeout.connect(self.check)
+        self.timer.start()
+
+        app = QApplication.instance()
+        if app is not None:
+            app.applicationStateChanged.connect(self.update_speed)
+        pass
+
+    def register(self, movie: QMovie, widget: QWidget = None):
+        """
+        Args:
+            movie (QMovie): 需要统一控制的 movie
+            widget (QWidget, optional): 显示 movie 的 widget，用来判断 movie 是否在可见区域内
+        """
+        key = id(movie)
+        self.movies[key] = movie
+        if widget is not None:
+            self.widgets[key] = weakref.ref(widget)
+        movie.destroyed.connect(lambda *args: self.unregister(key))
+        self.__apply(movie)
+        pass
+
+    def unregister(self, key: int):
+        self.movies.pop(key, None)
+        self.widgets.pop(key, None)
+        self.painted.discard(key)
+        self.offscreen.discard(key)
+        pass
+
+    def mark_painted(self, movie: QMovie):
+        """movie 被绘制了（即在可见区域内）。如果它之前因为不可见被暂停，就恢复播放。"""
+        key = id(movie)
+        self.painted.add(key)
+        if key in self.offscreen:
+            self.offscreen.discard(key)
+            self.__apply(movie)
+        pass
+
+    def target_speed(self) -> int:
+        """根据窗口与程序的状态，返回应有的播放速度（不考虑 CPU 预算）"""
+        visible = False
+        for widget in QApplication.topLevelWidgets():
+            if not widget.isVisible() or widget.isMinimized():
+                continue
+            handle = widget.windowHandle()
+            if handle is not None and not handle.isExposed():
+                # 窗口被完全遮挡（取决于平台是否支持）
+                continue
+            visible = True
+            break
+
+        if not visible:
+            return 0
+        if QApplication.applicationState() != QtCore.Qt.ApplicationState.ApplicationActive:
+            return min(self.unfocused_speed, 100)
+        return 100
+
+    def update_speed(self, *args):
+        target = self.target_speed()
+        speed = min(target, self.budget_speed) if target > 0 else 0
+        if speed != self.speed:
+            self.logger.debug('播放速度: %s%% -> %s%%', self.speed, speed)
+            self.speed = speed
+            for movie in self.movies.values():
+                self.__apply(movie)
+        pass
+
+    def check(self):
+        # 1. CPU 预算
+        cpu_time, wall_time = time.process_time(), time.monotonic()
+        if wall_time > self.last_wall_time:
+            usage = (cpu_time - self.last_cpu_time) / (wall_time - self.last_wall_time)
+            if usage > self.cpu_budget and self.budget_speed > 10:
+                self.budget_speed = max(self.budget_speed // 2, 10)
+            elif usage < self.cpu_budget / 2 and self.budget_speed < 100:
+                self.budget_speed = min(self.budget_speed * 2, 100)
+        self.last_cpu_time, self.last_wall_time = cpu_time, wall_time
+
+        # 2. 暂停不在可见区域内的 movie，恢复回到可见区域的 movie
+        for key, movie in self.movies.items():
+            on_screen = self.__on_screen(key)
+            if not on_screen and movie.state() == QMovie.MovieState.Running:
+                movie.setPaused(True)
+                self.offscreen.add(key)
+            elif on_screen and key in self.offscreen:
+                self.offscreen.discard(key)
+                self.__apply(movie)
+        self.painted.clear()
+
+        # 3. 窗口、焦点状态
+        self.update_speed()
+        pass
+
+    def __on_screen(self, key: int) -> bool:
+        ref = self.widgets.get(key)
+        widget = ref() if ref is not None else None
+        if widget is not None and widget.parentWidget() is not None:
+            # 子 widget 会收到 paintEvent，哪怕它被其它 widget 挡住、或者还没有被摆到任务行上，
+            # 所以不能用绘制来判断。visibleRegion() 已经去掉了超出父 widget（viewport）的部分
+            return widget.isVisible() and not widget.visibleRegion().isEmpty()
+        # 由 delegate 渲染的 widget 只有所在的任务行在可见区域内时才会被绘制
+        return key in self.painted
+
+    def __apply(self, movie: QMovie):
+        """把当前的播放速度应用到 movie"""
+        if movie.state() == QMovie.MovieState.NotRunning:
+            return
+        if self.speed == 0 or id(movie) in self.offscreen:
+            movie.setPaused(True)
+        else:
+            movie.setSpeed(self.speed)
+            movie.setPaused(False)
+        pass
+
 
 class MyLabel(QLabel):
     """docstring for MyLabel."""
@@ -30,6 +201,11 @@ class TaskInfoWidget(QWidget):
 
         self.first_paint = True
 
+        # 静态层缓存：widget 渲染出来的 QPixmap，只有内容变化时才重新渲染
+        self.pixmap_cache = None
+        # 重新渲染的次数，用来衡量绘制开销
+        self.render_count = 0
+
         # 1. 图标
         self.label_icon = QLabel(self)
         self.label_icon.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
@@ -44,11 +220,18 @@ class TaskInfoWidget(QWidget):
         ## self.label_icon.setPixmap(p.scaled(32, 32, transformMode=QtCore.Qt.TransformationMode.SmoothTransformation))
         
         # 1.2 QLabel 加载 gif
-        self.movie = QMovie(os.path.dirname(__file__) + "/loading.gif")
+        # movie 的 parent 必须是 self：AnimationGovernor 持有 movie，没有 parent 的 movie 永远不会被销毁，
+        # destroyed 信号不会发射，governor 也就一直不会注销它
+        self.movie = QMovie(os.path.dirname(__file__) + "/loading.gif", parent=self)
         self.movie.setScaledSize(QtCore.QSize(32, 32))
         self.movie.setCacheMode(QMovie.CacheMode.CacheAll)
         self.label_icon.setMovie(self.movie)
+        # gif 换帧后静态层就过期了
+        self.movie.frameChanged.connect(self.invalidate_cache)
         self.movie.start()
+        # 播放速度由 AnimationGovernor 统一控制
+        self.governor = AnimationGovernor.instance()
+        self.governor.register(self.movie, self)
 
         # 2. title
         self.label_title = MyLabel(self)
@@ -94,8 +277,62 @@ class TaskInfoWidget(QWidget):
             event (_type_): _description_
         """
         self.logger.debug('paint event: %s', event.rect())
+        self.governor.mark_painted(self.movie)
         pass
 
+    def invalidate_cache(self, *args):
+        """widget 的内容（图标、文字等）发生变化后调用，下次 cached_pixmap() 时重新渲染"""
+        self.pixmap_cache = None
+        pass
+
+    def cached_pixmap(self, size: QtCore.QSize, dpr: float = 1.0) -> QPixmap:
+        """返回 widget 渲染出来的 QPixmap（静态层）。
+
+        在 delegate 里绘制的时候，悬停、选中、焦点这些状态变化都会触发重绘，但 widget 本身的内容并没有变，
+        所以把 widget 渲染到 QPixmap 里缓存起来，状态变化时只需要贴图，再由 paint_state_overlay() 画上状态层。
+
+        Args:
+            size (QtCore.QSize): widget 的大小（通常是 option.rect.size()）
+            dpr (float, optional): 设备像素比
+        """
+        self.governor.mark_painted(self.movie)
+        pixmap = self.pixmap_cache
+        if pixmap is None or pixmap.deviceIndependentSize().toSize() != size or pixmap.devicePixelRatio() != dpr:
+            if self.size() != size:
+                self.resize(size)
+            pixmap = QPixmap(size * dpr)
+            pixmap.setDevicePixelRatio(dpr)
+            pixmap.fill(QtCore.Qt.GlobalColor.transparent)
+            # 直接渲染到 QPixmap 上，不会遇到 QWidget.render(painter, ...) 的坐标 BUG（QTBUG-26694）
+            self.render(pixmap)
+            self.pixmap_cache = pixmap
+            self.render_count += 1
+        return pixmap
+
+
+def paint_state_overlay(painter, option):
+    """在静态层之上绘制状态层：选中、悬停时的半透明色块，以及焦点框。
+
+    Args:
+        painter (QtGui.QPainter): 画笔
+        option (QtWidgets.QStyleOptionViewItem): 已经通过 initStyleOption() 初始化过的 option
+    """
+    state = option.state
+    if state & (QStyle.StateFlag.State_Selected | QStyle.StateFlag.State_MouseOver):
+        color = QColor(option.palette.highlight().color())
+        color.setAlpha(80 if state & QStyle.StateFlag.State_Selected else 30)
+        painter.fillRect(option.rect, color)
+
+    if state & QStyle.StateFlag.State_HasFocus:
+        focus_option = QStyleOptionFocusRect()
+        focus_option.rect = option.rect
+        focus_option.state = state
+        focus_option.palette = option.palette
+        focus_option.backgroundColor = option.palette.base().color()
+        style = option.widget.style() if option.widget is not None else QApplication.style()
+        style.drawPrimitive(QStyle.PrimitiveElement.PE_FrameFocusRect, focus_option, painter, option.widget)
+    pass
+
 def test_show_TaskInfoWidget():
     app = QApplication(sys.argv)
 
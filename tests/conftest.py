@@ -0,0 +1,108 @@
+import os, sys
+
+# 必须在创建 QApplication 之前设置，无界面环境下也能运行
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import importlib
+
+import pytest
+import shiboken6
+from PySide6 import QtCore
+from PySide6.QtWidgets import QApplication
+
+# 所有的视图方案
+VARIANTS = ['tv1_setindexwidget', 'tv2_emitdatachanged', 'tv3_update_iconrect', 'tv4_setparent']
+# 使用 TaskInfoDelegate 的视图方案
+DELEGATE_VARIANTS = ['tv2_emitdatachanged', 'tv3_update_iconrect', 'tv4_setparent']
+
+
+def make_task_groups(group_count: int = 5, task_count: int = 20) -> list:
+    """生成测试用的任务数据 [(任务组标题, [任务标题, ...]), ...]，其中一部分标题带有 HTML 标签"""
+    task_groups = []
+    for g in range(group_count):
+        titles = []
+        for t in range(task_count):
+            if t % 3 == 0:
+                titles.append('t_<span style="color:red;"><b>任务</b></span>task %d-%d' % (g, t))
+            else:
+                titles.append('t_task %d-%d' % (g, t))
+        task_groups.append(('TG_%d' % g, titles))
+    return task_groups
+
+
+@pytest.fixture(scope='session')
+def app():
+    return QApplication.instance() or QApplication(sys.argv)
+
+
+@pytest.fixture
+def build_window(app, tmp_path):
+    """返回一个工厂函数 build(variant, task_groups)，创建并显示该视图方案的 MainWindow。测试结束后自动关闭。"""
+    windows = []
+
+    def build(variant: str, task_groups: list = None):
+        module = importlib.import_module(variant)
+        task_groups = task_groups if task_groups is not None else make_task_groups()
+        if variant == 'tv2_emitdatachanged':
+            window = module.MainWindow(task_groups, snapshot_path=build.snapshot_path)
+        else:
+            window = module.MainWindow(task_groups)
+        window.resize(400, 500)
+        window.show()
+        windows.append(window)
+        wait(app, 50)
+        return window
+
+    # 与 build() 创建的 tv2 窗口使用同一个启动快照
+    build.snapshot_path = str(tmp_path / 'snapshot.bin')
+    yield build
+
+    for window in windows:
+        if shiboken6.isValid(window):
+            close_window(app, window)
+
+
+def close_window(app, window):
+    """关闭并销毁 window。没有运行事件循环时 deleteLater() 不会自动执行，需要手动处理 DeferredDelete 事件"""
+    window.close()
+    window.deleteLater()
+    wait(app, 10)
+    app.sendPostedEvents(None, QtCore.QEvent.Type.DeferredDelete)
+
+
+def task_widgets(window) -> list:
+    """返回 treeview 中所有已经加载的任务的 TaskInfoWidget"""
+    treeview = window.treeview
+    model = treeview.model()
+    widgets = []
+    for group_row in range(model.rowCount()):
+        group = model.index(group_row, 0)
+        for task_row in range(model.rowCount(group)):
+            idx = model.index(task_row, 0, group)
+            widget = treeview.indexWidget(idx) or idx.data(QtCore.Qt.ItemDataRole.UserRole)
+            if widget is None and isinstance(model, QtCore.QSortFilterProxyModel):
+                # tv2 的 TaskInfoWidget 不在 model 里，而是保存在 TaskInfoItem.widget
+                source = model.mapToSource(idx)
+                widget = getattr(source.model().itemFromIndex(source), 'widget', None)
+            if widget is not None:
+                widgets.append(widget)
+    return widgets
+
+
+def visible_rows(treeview) -> int:
+    """返回 treeview 可见区域内的行数"""
+    count = 0
+    idx = treeview.indexAt(QtCore.QPoint(0, 0))
+    while idx.isValid() and treeview.visualRect(idx).top() < treeview.viewport().height():
+        count += 1
+        idx = treeview.indexBelow(idx)
+    return count
+
+
+def wait(app, ms: int):
+    """处理 ms 毫秒内的事件"""
+    deadline = QtCore.QDeadlineTimer(ms)
+    while not deadline.hasExpired():
+        app.processEvents(QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 5)
+    app.processEvents()
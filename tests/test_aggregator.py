@@ -0,0 +1,83 @@
+"""DataChangedAggregator：把同一轮事件循环中的 emitDataChanged() 合并成按区间发射的 dataChanged。"""
+import pytest
+from PySide6 import QtCore
+from PySide6.QtGui import QStandardItemModel, QStandardItem
+
+from conftest import wait
+from mymodel import DataChangedAggregator, SEARCH_ROLE
+
+DISPLAY = int(QtCore.Qt.ItemDataRole.DisplayRole)
+DECORATION = int(QtCore.Qt.ItemDataRole.DecorationRole)
+
+
+@pytest.fixture
+def tree(app):
+    """一个任务组下有 10 个任务的 model，以及记录 dataChanged 的列表 [(父节点行号, 首行, 末行, roles), ...]"""
+    model = QStandardItemModel()
+    group = QStandardItem('TG_0')
+    group.appendRows([QStandardItem('task %d' % row) for row in range(10)])
+    model.appendRow(group)
+
+    signals = []
+    model.dataChanged.connect(lambda top_left, bottom_right, roles: signals.append(
+        (top_left.parent().row(), top_left.row(), bottom_right.row(), sorted(int(r) for r in roles))))
+    yield model, group, signals
+    model.deleteLater()
+
+
+def test_consecutive_rows_merged_into_runs(tree):
+    model, group, signals = tree
+    aggregator = DataChangedAggregator()
+    for row in [9, 0, 5, 1, 6, 2]:
+        aggregator.post(group.child(row), [DECORATION])
+    aggregator.flush()
+
+    assert sorted(signals) == [(0, 0, 2, [DECORATION]), (0, 5, 6, [DECORATION]), (0, 9, 9, [DECORATION])]
+
+
+def test_roles_merged_across_rows(tree):
+    model, group, signals = tree
+    aggregator = DataChangedAggregator()
+    aggregator.post(group.child(0), [DECORATION])
+    aggregator.post(group.child(1), [DISPLAY])
+    aggregator.post(group.child(0), [SEARCH_ROLE])
+    aggregator.flush()
+
+    assert signals == [(0, 0, 1, sorted([DISPLAY, DECORATION, SEARCH_ROLE]))]
+
+
+def test_none_roles_hint_covers_whole_run(tree):
+    model, group, signals = tree
+    aggregator = DataChangedAggregator()
+    aggregator.post(group.child(3), [DECORATION])
+    aggregator.post(group.child(4))
+    aggregator.post(group.child(4), [DISPLAY])
+    aggregator.post(group.child(8), [DECORATION])
+    aggregator.flush()
+
+    # 第 4 行没有指定 role，整个区间按所有 role 处理（空列表）；第 8 行不受影响
+    assert sorted(signals) == [(0, 3, 4, []), (0, 8, 8, [DECORATION])]
+
+
+def test_items_removed_from_model_dropped(tree):
+    model, group, signals = tree
+    aggregator = DataChangedAggregator()
+    aggregator.post(group.child(0), [DECORATION])
+    removed = group.takeRow(1)[0]
+    aggregator.post(removed, [DECORATION])
+    aggregator.flush()
+
+    assert signals == [(0, 0, 0, [DECORATION])]
+
+
+def test_posts_flushed_once_in_next_event_loop(app, tree):
+    model, group, signals = tree
+    aggregator = DataChangedAggregator()
+    for _ in range(3):
+        for row in range(10):
+            aggregator.post(group.child(row), [DECORATION])
+    assert signals == []
+
+    wait(app, 10)
+    assert signals == [(0, 0, 9, [DECORATION])]
+    assert aggregator.pending == {}
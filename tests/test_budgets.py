@@ -0,0 +1,182 @@
+"""绘制、内存、过滤耗时的回归测试。
+
+每个测试都有一个预算（见下面的常量），超出预算就说明某个修改让绘制路径或者过滤变慢了。
+"""
+import os, time
+
+import pytest
+from PySide6 import QtCore
+from PySide6.QtTest import QTest
+
+from conftest import VARIANTS, DELEGATE_VARIANTS, make_task_groups, task_widgets, visible_rows, wait
+from mymodel import search_text
+from mywidget import AnimationGovernor
+
+# 一次完整重绘中，每个可见行最多调用几次 delegate.paint()
+MAX_PAINTS_PER_VISIBLE_ROW = 1
+# 动画运行 ANIMATION_TICKS 帧之后，存活的 QObject 最多增加多少个
+MAX_LIVE_OBJECT_GROWTH = 0
+# 反复重绘之后，每个 QMovie.frameChanged 信号的连接数最多增加多少个
+MAX_CONNECTION_GROWTH = 0
+# 动画运行 ANIMATION_TICKS 帧之后，RSS 最多增长多少 MB
+MAX_RSS_GROWTH_MB = 16
+# 每次按键（搜索栏文本变化）之后，过滤最多耗时多少秒
+MAX_FILTER_SECONDS_PER_KEYSTROKE = 0.5
+
+ANIMATION_TICKS = 300
+SEARCH_TEXT = 'task 3-1'
+# 过滤耗时测试的任务数据 (任务组数量, 每组任务数量)。
+# tv2 的总行数超过 ParallelFilterExecutor 的 min_rows；tv3、tv4 会一次性创建所有 TaskInfoWidget，只能少一些
+FILTER_TASK_GROUPS = {
+    'tv2_emitdatachanged': (10, 2100),
+    'tv3_update_iconrect': (10, 200),
+    'tv4_setparent': (10, 200),
+}
+
+
+def tick_animation(app, widgets: list, ticks: int):
+    """让每个 gif 前进 ticks 帧"""
+    for widget in widgets:
+        widget.movie.stop()
+    for _ in range(ticks):
+        for widget in widgets:
+            widget.movie.jumpToNextFrame()
+        app.processEvents()
+    app.processEvents()
+
+
+def scroll_through(app, treeview):
+    scrollbar = treeview.verticalScrollBar()
+    for value in range(scrollbar.minimum(), scrollbar.maximum() + 1, max(scrollbar.pageStep(), 1)):
+        scrollbar.setValue(value)
+        app.processEvents()
+    scrollbar.setValue(scrollbar.minimum())
+    app.processEvents()
+
+
+def live_objects(app, window) -> int:
+    # 没有 parent 的 TaskInfoWidget 不在 window 的 children 里，所以还要加上所有 widget 的数量。
+    # QMovie 不是 widget，没有 parent 的 QMovie 两者都不包括，所以再加上 AnimationGovernor 登记的 movie 数量
+    return len(window.findChildren(QtCore.QObject)) + len(app.allWidgets()) + len(AnimationGovernor.instance().movies)
+
+
+def rss_mb() -> float:
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+
+
+@pytest.mark.parametrize('variant', DELEGATE_VARIANTS)
+def test_delegate_paints_per_frame(app, build_window, monkeypatch, variant):
+    window = build_window(variant)
+    delegate_class = type(window.treeview.itemDelegate())
+    paints = []
+    original_paint = delegate_class.paint
+
+    def counting_paint(self, painter, option, index):
+        paints.append(index)
+        return original_paint(self, painter, option, index)
+
+    monkeypatch.setattr(delegate_class, 'paint', counting_paint)
+    window.treeview.viewport().repaint()
+
+    rows = visible_rows(window.treeview)
+    assert rows > 0
+    assert 0 < len(paints) <= rows * MAX_PAINTS_PER_VISIBLE_ROW
+
+
+def test_paint_does_not_emit_data_changed(app, build_window):
+    """tv2 在绘制时才创建 TaskInfoWidget，创建的过程不能修改 model"""
+    window = build_window('tv2_emitdatachanged', make_task_groups(2, 40))
+    before = len(task_widgets(window))
+    changes = []
+    window.treemodel.dataChanged.connect(lambda *args: changes.append(args))
+
+    # 滚动到还没有绘制过的任务行，重绘时创建这些任务的 widget
+    scrollbar = window.treeview.verticalScrollBar()
+    scrollbar.setValue(scrollbar.maximum() // 2)
+    window.treeview.viewport().repaint()
+    assert len(task_widgets(window)) > before
+    assert changes == []
+
+
+@pytest.mark.parametrize('variant', ['tv2_emitdatachanged', 'tv3_update_iconrect'])
+def test_hover_does_not_rerender(app, build_window, variant):
+    window = build_window(variant)
+    widgets = task_widgets(window)
+    for widget in widgets:
+        widget.movie.stop()
+    wait(app, 20)
+
+    before = sum(widget.render_count for widget in widgets)
+    viewport = window.treeview.viewport()
+    for y in range(0, viewport.height(), 5):
+        QTest.mouseMove(viewport, QtCore.QPoint(100, y))
+        app.processEvents()
+    assert sum(widget.render_count for widget in widgets) == before
+
+
+@pytest.mark.parametrize('variant', VARIANTS)
+def test_live_objects_bounded(app, build_window, variant):
+    window = build_window(variant)
+    # 先滚动一遍，让懒加载的 widget 都创建出来
+    scroll_through(app, window.treeview)
+    tick_animation(app, task_widgets(window), 10)
+    before = live_objects(app, window)
+
+    scroll_through(app, window.treeview)
+    tick_animation(app, task_widgets(window), ANIMATION_TICKS)
+    assert live_objects(app, window) - before <= MAX_LIVE_OBJECT_GROWTH
+
+
+@pytest.mark.parametrize('variant', [
+    'tv2_emitdatachanged',
+    pytest.param('tv3_update_iconrect', marks=pytest.mark.xfail(
+        strict=True, reason='tv3 在 paint() 里为 frameChanged 连接新的 lambda，连接数会不断增长')),
+    'tv4_setparent',
+])
+def test_signal_connections_bounded(app, build_window, variant):
+    window = build_window(variant)
+    signal = QtCore.SIGNAL('frameChanged(int)')
+    widgets = task_widgets(window)
+    before = [widget.movie.receivers(signal) for widget in widgets]
+
+    for _ in range(20):
+        window.treeview.viewport().repaint()
+    after = [widget.movie.receivers(signal) for widget in widgets]
+    # tv3 预期会失败，pytest 会一直保留失败时的局部变量。先释放 widgets，否则这些 TaskInfoWidget 在窗口销毁之后
+    # 还会继续播放，frameChanged 调用 tv3 在 paint() 里连接的 lambda，访问已经销毁的视图
+    del widgets
+    assert max(a - b for a, b in zip(after, before)) <= MAX_CONNECTION_GROWTH
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/statm'), reason='需要 /proc/self/statm 读取 RSS')
+@pytest.mark.parametrize('variant', VARIANTS)
+def test_rss_growth_bounded(app, build_window, variant):
+    window = build_window(variant)
+    widgets = task_widgets(window)
+    # 预热：让 QMovie 的帧缓存（CacheAll）都填满
+    tick_animation(app, widgets, 50)
+    before = rss_mb()
+
+    tick_animation(app, widgets, ANIMATION_TICKS)
+    assert rss_mb() - before <= MAX_RSS_GROWTH_MB
+
+
+@pytest.mark.parametrize('variant', DELEGATE_VARIANTS)
+def test_filter_time_per_keystroke(app, build_window, variant):
+    task_groups = make_task_groups(*FILTER_TASK_GROUPS[variant])
+    window = build_window(variant, task_groups)
+    for n in range(1, len(SEARCH_TEXT) + 1):
+        start = time.perf_counter()
+        window.ui_search.setText(SEARCH_TEXT[:n])
+        app.processEvents()
+        assert time.perf_counter() - start <= MAX_FILTER_SECONDS_PER_KEYSTROKE, SEARCH_TEXT[:n]
+
+    # 过滤结果：只剩下 TG_3 中包含 SEARCH_TEXT 的任务
+    model = window.treeview.model()
+    assert model.rowCount() == 1
+    group = model.index(0, 0)
+    while model.canFetchMore(group):
+        model.fetch_next_page(group)
+    expected = [title for title in task_groups[3][1] if SEARCH_TEXT in search_text(title)]
+    assert [model.index(row, 0, group).data() for row in range(model.rowCount(group))] == expected
@@ -0,0 +1,74 @@
+"""ParallelFilterExecutor：多进程匹配的结果必须与逐行用 QRegularExpression 匹配的结果一致。"""
+import pytest
+from PySide6 import QtCore
+
+from conftest import make_task_groups
+from myfilter import ParallelFilterExecutor
+from mymodel import search_text
+
+# executor 负责匹配的 pattern
+SUPPORTED_PATTERNS = ['task', 'TASK 1-1', '任务', r't_.*3$', '(?:1|2)-1[0-9]', r'[^a-z]\.?4', 'no such task']
+# Python re 的含义与 QRegularExpression 不同（或者不完整）的 pattern，executor 应该交还给调用者
+UNSUPPORTED_PATTERNS = ['9[[:digit:]]', r'\d-\d', r'(?P<n>task)', 'task (']
+
+
+def search_groups(task_groups: list) -> list:
+    return [[search_text(title)] + [search_text(t) for t in titles] for title, titles in task_groups]
+
+
+def qt_match(groups: list, pattern: str) -> list:
+    regex = QtCore.QRegularExpression(pattern, QtCore.QRegularExpression.PatternOption.CaseInsensitiveOption)
+    return [bytes(1 if regex.match(text).hasMatch() else 0 for text in group) for group in groups]
+
+
+@pytest.fixture(scope='module')
+def executor():
+    # min_rows=0：即使任务很少也走进程池与共享内存
+    executor = ParallelFilterExecutor(max_workers=2, min_rows=0)
+    executor.set_groups(search_groups(make_task_groups(3, 50)))
+    yield executor
+    executor.shutdown()
+
+
+@pytest.mark.parametrize('pattern', SUPPORTED_PATTERNS)
+def test_parallel_matches_qt(executor, pattern):
+    assert executor.match(pattern) == qt_match(executor.groups, pattern)
+
+
+@pytest.mark.parametrize('pattern', UNSUPPORTED_PATTERNS)
+def test_unsupported_pattern_falls_back(executor, pattern):
+    assert executor.match(pattern) is None
+
+
+def test_small_tree_falls_back():
+    executor = ParallelFilterExecutor(max_workers=2)
+    executor.set_groups(search_groups(make_task_groups(2, 10)))
+    assert executor.match('task') is None
+    assert executor.pool is None
+
+
+def visible_titles(proxy) -> list:
+    titles = []
+    for group_row in range(proxy.rowCount()):
+        group = proxy.index(group_row, 0)
+        while proxy.canFetchMore(group):
+            proxy.fetch_next_page(group)
+        titles.append([group.data()] + [proxy.index(row, 0, group).data() for row in range(proxy.rowCount(group))])
+    return titles
+
+
+@pytest.mark.parametrize('pattern', ['task 1-1', '9[[:digit:]]'])
+def test_proxy_results_match_serial(app, build_window, pattern):
+    task_groups = make_task_groups(3, 250)
+    serial = build_window('tv2_emitdatachanged', task_groups)
+    serial.proxymodel.executor = None
+    serial.ui_search.setText(pattern)
+
+    parallel = build_window('tv2_emitdatachanged', task_groups)
+    parallel.proxymodel.executor = ParallelFilterExecutor(max_workers=2, min_rows=0)
+    try:
+        parallel.ui_search.setText(pattern)
+        assert visible_titles(parallel.proxymodel) == visible_titles(serial.proxymodel)
+        assert len(visible_titles(serial.proxymodel)) > 0
+    finally:
+        parallel.proxymodel.executor.shutdown()
@@ -0,0 +1,105 @@
+"""AnimationGovernor：窗口隐藏、最小化、失去焦点、任务行不可见时的 gif 节流。"""
+import time
+
+import pytest
+from PySide6 import QtCore
+from PySide6.QtGui import QMovie
+from PySide6.QtWidgets import QApplication
+
+from conftest import VARIANTS, close_window, make_task_groups, task_widgets, visible_rows, wait
+from mywidget import AnimationGovernor
+
+
+def running(widgets: list) -> int:
+    return sum(1 for widget in widgets if widget.movie.state() == QMovie.MovieState.Running)
+
+
+@pytest.mark.parametrize('variant', VARIANTS)
+def test_hidden_window_pauses_movies(app, build_window, variant):
+    window = build_window(variant)
+    governor = AnimationGovernor.instance()
+    widgets = task_widgets(window)
+
+    window.hide()
+    governor.check()
+    assert governor.speed == 0
+    assert running(widgets) == 0
+
+    window.show()
+    wait(app, 20)
+    governor.update_speed()
+    assert governor.speed > 0
+
+
+@pytest.mark.parametrize('variant', VARIANTS)
+def test_minimized_window_pauses_movies(app, build_window, variant):
+    window = build_window(variant)
+    governor = AnimationGovernor.instance()
+
+    window.showMinimized()
+    wait(app, 20)
+    governor.update_speed()
+    assert governor.speed == 0
+    assert running(task_widgets(window)) == 0
+
+    window.showNormal()
+    wait(app, 20)
+    governor.update_speed()
+    assert governor.speed > 0
+
+
+@pytest.mark.parametrize('variant', VARIANTS)
+def test_offscreen_rows_are_paused(app, build_window, variant):
+    window = build_window(variant, make_task_groups(2, 20))
+    governor = AnimationGovernor.instance()
+    widgets = task_widgets(window)
+
+    # 第一次检查清空绘制记录；重绘之后只有可见的任务行还在播放
+    governor.check()
+    window.treeview.viewport().repaint()
+    governor.check()
+    assert 0 < running(widgets) <= visible_rows(window.treeview)
+
+    # 滚动之后，新进入可见区域的任务行恢复播放
+    scrollbar = window.treeview.verticalScrollBar()
+    scrollbar.setValue(scrollbar.maximum())
+    window.treeview.viewport().repaint()
+    assert widgets[-1].movie.state() == QMovie.MovieState.Running
+
+
+@pytest.mark.parametrize('variant', VARIANTS)
+def test_closed_window_unregisters_movies(app, build_window, variant):
+    governor = AnimationGovernor.instance()
+    before = set(governor.movies)
+    window = build_window(variant)
+    assert len(governor.movies) > len(before)
+
+    # 销毁窗口时，它的所有 TaskInfoWidget 与 QMovie 都要被释放，governor 不能再持有它们
+    close_window(app, window)
+    assert set(governor.movies) == before
+    assert set(governor.widgets) <= before
+
+
+def test_unfocused_speed(app, build_window, monkeypatch):
+    build_window('tv2_emitdatachanged')
+    governor = AnimationGovernor.instance()
+
+    monkeypatch.setattr(QApplication, 'applicationState',
+                        staticmethod(lambda: QtCore.Qt.ApplicationState.ApplicationInactive))
+    governor.update_speed()
+    assert governor.speed == min(governor.unfocused_speed, governor.budget_speed)
+
+    monkeypatch.undo()
+    governor.update_speed()
+    assert governor.speed == min(100, governor.budget_speed)
+
+
+def test_cpu_budget_throttles_speed(app):
+    governor = AnimationGovernor(cpu_budget=0.01, check_interval=60000)
+    # 忙等一段时间，让 CPU 占用远超预算
+    deadline = time.monotonic() + 0.05
+    while time.monotonic() < deadline:
+        pass
+    governor.check()
+    assert governor.budget_speed == 50
+    governor.deleteLater()
@@ -0,0 +1,26 @@
+"""tv2 的任务按页加载：滚动到任何一个任务组已加载部分的末尾，都要加载该任务组的下一页。"""
+from conftest import make_task_groups
+
+
+def loaded_counts(window) -> list:
+    model = window.treemodel
+    return [model.item(row).rowCount() for row in range(model.rowCount())]
+
+
+def scroll_page_by_page(app, treeview):
+    """一页一页地滚动到底部（加载出新的任务后，滚动条的最大值会变大）"""
+    scrollbar = treeview.verticalScrollBar()
+    scrollbar.setValue(scrollbar.minimum())
+    app.processEvents()
+    while scrollbar.value() < scrollbar.maximum():
+        scrollbar.setValue(scrollbar.value() + max(scrollbar.pageStep(), 1))
+        app.processEvents()
+
+
+def test_scrolling_loads_every_group(app, build_window):
+    window = build_window('tv2_emitdatachanged', make_task_groups(3, 400))
+    assert all(count < 400 for count in loaded_counts(window))
+
+    scroll_page_by_page(app, window.treeview)
+    assert loaded_counts(window) == [400, 400, 400]
+
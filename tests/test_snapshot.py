@@ -0,0 +1,92 @@
+"""启动快照：先绘制快照的占位模型，之后再加载完整数据。"""
+from PySide6.QtGui import QStandardItemModel
+
+import mymodel
+import tv2_emitdatachanged
+from mymodel import TreeSnapshot, search_text
+from conftest import close_window, make_task_groups, wait
+
+
+def test_snapshot_painted_before_full_model(app, build_window, monkeypatch):
+    task_groups = make_task_groups(2, 5)
+    # 第一个窗口关闭时保存启动快照
+    build_window('tv2_emitdatachanged', task_groups).close()
+
+    # 记录每次 delegate.paint() 时 proxy 的 source model
+    models = []
+    original_paint = tv2_emitdatachanged.TaskInfoDelegate.paint
+
+    def recording_paint(self, painter, option, index):
+        models.append(type(index.model().sourceModel()))
+        return original_paint(self, painter, option, index)
+
+    monkeypatch.setattr(tv2_emitdatachanged.TaskInfoDelegate, 'paint', recording_paint)
+    window = build_window('tv2_emitdatachanged', task_groups)
+    wait(app, 20)
+
+    assert isinstance(window.proxymodel.sourceModel(), tv2_emitdatachanged.TaskItemModel)
+    # 第一次绘制的是快照的占位模型，之后才是完整的 TaskItemModel
+    assert models[0] is QStandardItemModel
+    assert tv2_emitdatachanged.TaskItemModel in models
+    assert models.index(tv2_emitdatachanged.TaskItemModel) > 0
+
+
+def test_placeholder_shows_plain_text(app, build_window):
+    task_groups = [('TG', ['t_<span style="color:red;"><b>任务</b></span>task2', 't_plain'])]
+    build_window('tv2_emitdatachanged', task_groups).close()
+
+    # 不显示窗口，完整数据要等到第一次绘制之后才加载，proxy 里还是占位模型
+    window = tv2_emitdatachanged.MainWindow(task_groups, snapshot_path=build_window.snapshot_path)
+    try:
+        proxy = window.proxymodel
+        assert type(proxy.sourceModel()) is QStandardItemModel
+        group = proxy.index(0, 0)
+        assert [proxy.index(row, 0, group).data() for row in range(proxy.rowCount(group))] == ['t_任务task2', 't_plain']
+    finally:
+        close_window(app, window)
+
+
+def test_snapshot_search_index_covers_unloaded_tasks(app, build_window):
+    task_groups = make_task_groups(2, 300)
+    window = build_window('tv2_emitdatachanged', task_groups)
+    # 每个任务组只加载了第一页
+    assert all(window.treemodel.item(row).rowCount() < 300 for row in range(2))
+    window.close()
+
+    snapshot = TreeSnapshot.load(build_window.snapshot_path)
+    assert snapshot.search_index == [[search_text(title) for title in titles] for _, titles in task_groups]
+
+
+def test_full_model_uses_snapshot_search_index(app, build_window, monkeypatch):
+    task_groups = make_task_groups(2, 300)
+    build_window('tv2_emitdatachanged', task_groups).close()
+
+    # 完整模型的搜索与按标题排序都不应该再解析任务标题（任务组的标题不在搜索索引中）
+    parsed = []
+    original_search_text = mymodel.search_text
+    monkeypatch.setattr(mymodel, 'search_text', lambda text: parsed.append(text) or original_search_text(text))
+    window = build_window('tv2_emitdatachanged', task_groups)
+    wait(app, 20)
+    assert isinstance(window.proxymodel.sourceModel(), tv2_emitdatachanged.TaskItemModel)
+    window.ui_search.setText('task 1-250')
+    window.ui_sort.setCurrentIndex(window.ui_sort.findData('title'))
+    wait(app, 20)
+    assert [text for text in parsed if text.startswith('t_')] == []
+
+
+def test_placeholder_keeps_groups_with_unloaded_matches(app, build_window):
+    task_groups = make_task_groups(2, 300)
+    build_window('tv2_emitdatachanged', task_groups).close()
+    # 上次退出时只加载了第一页，task 1-250 不在快照的任务树里
+    snapshot = TreeSnapshot.load(build_window.snapshot_path)
+    assert all('task 1-250' not in text for _, _, text, _ in snapshot.rows)
+    snapshot.filter_text = 'task 1-250'
+    snapshot.save(build_window.snapshot_path)
+
+    window = tv2_emitdatachanged.MainWindow(task_groups, snapshot_path=build_window.snapshot_path)
+    try:
+        proxy = window.proxymodel
+        assert type(proxy.sourceModel()) is QStandardItemModel
+        assert [proxy.index(row, 0).data() for row in range(proxy.rowCount())] == ['TG_1']
+    finally:
+        close_window(app, window)
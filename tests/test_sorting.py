@@ -0,0 +1,160 @@
+"""SearchProxyModel 的排序：预先计算好的排序键，以及单行更新时的增量排序。"""
+import gc
+
+from PySide6 import QtCore
+from PySide6.QtWidgets import QApplication
+
+from conftest import wait
+from myfilter import ParallelFilterExecutor
+from mywidget import TaskInfoWidget
+
+
+def child_titles(proxy, group_row: int = 0) -> list:
+    group = proxy.index(group_row, 0)
+    return [proxy.index(row, 0, group).data() for row in range(proxy.rowCount(group))]
+
+
+def build_sorting_window(build_window):
+    task_groups = [
+        ('TG_B', ['t_<b>Zeta</b>', 't_alpha', 't_<span style="color:red;">Mu</span>']),
+        ('TG_A', ['t_beta']),
+    ]
+    window = build_window('tv2_emitdatachanged', task_groups)
+    root = window.treemodel.invisibleRootItem()
+    return window, [root.child(0).child(row) for row in range(root.child(0).rowCount())]
+
+
+def test_sort_by_title_ignores_html(app, build_window):
+    window, tasks = build_sorting_window(build_window)
+    window.ui_sort.setCurrentIndex(window.ui_sort.findData('title'))
+    proxy = window.proxymodel
+
+    assert [proxy.index(row, 0).data() for row in range(proxy.rowCount())] == ['TG_A', 'TG_B']
+    assert child_titles(proxy, 1) == ['t_alpha', 't_<span style="color:red;">Mu</span>', 't_<b>Zeta</b>']
+
+    # 恢复原来的顺序
+    window.ui_sort.setCurrentIndex(window.ui_sort.findData(None))
+    assert child_titles(proxy, 0) == [task.text() for task in tasks]
+
+
+def test_sort_by_status_moves_updated_row(app, build_window):
+    window, tasks = build_sorting_window(build_window)
+    for status, task in zip([2, 0, 1], tasks):
+        task.set_status(status)
+    window.ui_sort.setCurrentIndex(window.ui_sort.findData('status'))
+    proxy = window.proxymodel
+
+    # 按状态排序时，任务组保持原来的顺序
+    assert [proxy.index(row, 0).data() for row in range(proxy.rowCount())] == ['TG_B', 'TG_A']
+    assert child_titles(proxy) == [tasks[1].text(), tasks[2].text(), tasks[0].text()]
+
+    # 只更新一行的状态：dynamicSortFilter 把这一行移动到新的位置
+    tasks[0].set_status(-1)
+    wait(app, 10)
+    assert child_titles(proxy) == [tasks[0].text(), tasks[1].text(), tasks[2].text()]
+
+
+def test_sort_by_timestamp_descending(app, build_window):
+    window, tasks = build_sorting_window(build_window)
+    for timestamp, task in zip([100.0, 300.0, 200.0], tasks):
+        task.set_timestamp(timestamp)
+    window.proxymodel.sort_by('timestamp', QtCore.Qt.SortOrder.DescendingOrder)
+
+    assert child_titles(window.proxymodel) == [tasks[1].text(), tasks[2].text(), tasks[0].text()]
+
+
+def all_child_titles(proxy, group_row: int = 0) -> list:
+    group = proxy.index(group_row, 0)
+    while proxy.canFetchMore(group):
+        proxy.fetch_next_page(group)
+    return child_titles(proxy, group_row)
+
+
+def test_sort_large_group_with_unloaded_rows(app, build_window):
+    # 原来的顺序与标题顺序正好相反
+    titles = ['t_task %04d' % (999 - i) for i in range(1000)]
+    window = build_window('tv2_emitdatachanged', [('TG_Big', titles)])
+    group = window.treemodel.invisibleRootItem().child(0)
+    window.treemodel.fetch_rows(group, 300 - group.rowCount())
+    proxy = window.proxymodel
+
+    # 只加载了 300 个任务，显示的也必须是完整排序结果的前 300 个
+    window.ui_sort.setCurrentIndex(window.ui_sort.findData('title'))
+    assert group.rowCount() == 300
+    assert child_titles(proxy) == sorted(titles)[:300]
+    assert all_child_titles(proxy) == sorted(titles)
+
+    proxy.sort_by('title', QtCore.Qt.SortOrder.DescendingOrder)
+    assert child_titles(proxy)[:5] == titles[:5]
+
+    # 恢复原来的顺序
+    window.ui_sort.setCurrentIndex(window.ui_sort.findData(None))
+    assert all_child_titles(proxy) == titles
+
+
+def test_sort_by_fields_from_task_data(app, build_window):
+    tasks = [('t_a', 2, 300.0), ('t_b', 0, 100.0), ('t_c', 1, 200.0), 't_d']
+    window = build_window('tv2_emitdatachanged', [('TG', tasks)])
+    proxy = window.proxymodel
+
+    window.ui_sort.setCurrentIndex(window.ui_sort.findData('status'))
+    assert child_titles(proxy) == ['t_b', 't_d', 't_c', 't_a']
+    window.ui_sort.setCurrentIndex(window.ui_sort.findData('timestamp'))
+    assert child_titles(proxy) == ['t_d', 't_b', 't_c', 't_a']
+
+
+def test_updated_row_moves_past_unloaded_rows(app, build_window):
+    titles = ['t_task %04d' % i for i in range(300)]
+    window = build_window('tv2_emitdatachanged', [('TG', titles)])
+    window.proxymodel.sort_by('status')
+    group = window.treemodel.invisibleRootItem().child(0)
+    loaded = group.rowCount()
+    assert loaded < len(titles)
+
+    # 第一个任务的状态变大之后，应该排在所有（包括还没加载的）任务之后
+    task = group.child(0)
+    assert task.task_widget() is not None
+    task.set_status(1)
+    assert group.rowCount() == loaded - 1
+    # 放回还没加载的任务中的 item 要释放它的 widget
+    assert task.widget is None
+    wait(app, 10)
+    assert all_child_titles(window.proxymodel) == titles[1:] + titles[:1]
+
+
+def test_sort_while_searching_with_executor(app, build_window):
+    titles = ['t_task %04d' % i for i in range(1000)]
+    window = build_window('tv2_emitdatachanged', [('TG', titles)])
+    proxy = window.proxymodel
+    proxy.executor = ParallelFilterExecutor(max_workers=2, min_rows=0)
+    try:
+        window.ui_search.setText('task 0[05]')
+        expected = [title for title in titles if title[7] == '0' and title[8] in '05']
+
+        # 排序后任务的加载顺序变了，executor 的匹配结果也要跟着新的顺序重新计算
+        proxy.sort_by('title', QtCore.Qt.SortOrder.DescendingOrder)
+        assert all_child_titles(proxy) == sorted(expected, reverse=True)
+        proxy.sort_by(None)
+        assert all_child_titles(proxy) == expected
+    finally:
+        proxy.executor.shutdown()
+
+
+def test_sort_keeps_loaded_rows_and_releases_widgets(app, build_window):
+    titles = ['t_task %04d' % i for i in range(1000)]
+    window = build_window('tv2_emitdatachanged', [('TG_0', titles), ('TG_1', titles)])
+    groups = [window.treemodel.item(row) for row in range(window.treemodel.rowCount())]
+    loaded = [group.rowCount() for group in groups]
+
+    for i in range(20):
+        window.proxymodel.sort_by([None, 'title', 'status', 'timestamp'][i % 4], QtCore.Qt.SortOrder(i % 2))
+        wait(app, 5)
+        # 排序后 treeview 会重新布局，但不能因此多加载一页
+        assert [group.rowCount() for group in groups] == loaded
+
+    # 排到已加载部分之后的任务，它们的 item 被复用、widget 被释放。存活的 widget 都属于已加载的 item
+    gc.collect()
+    owned = {id(group.child(row).widget) for group in groups for row in range(group.rowCount())
+             if group.child(row).widget is not None}
+    alive = {id(widget) for widget in QApplication.allWidgets() if isinstance(widget, TaskInfoWidget)}
+    assert alive == owned
@@ -7,8 +7,18 @@ from PySide6.QtGui import QStandardItemModel, QStandardItem
 
 from mywidget import TaskInfoWidget
 
+# 任务数据: [(任务组标题, [任务标题, ...]), ...]
+TASK_GROUPS = [
+    ('TG_Default', ['t_任务1', 't_<span style="color:red;"><b>任务</b></span>task2', 't_资料收集333']),
+    ('TG_Test', ['t_发送测试', 't_collection 1']),
+]
+
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, task_groups: list = TASK_GROUPS):
+        """
+        Args:
+            task_groups (list, optional): 任务数据 [(任务组标题, [任务标题, ...]), ...]
+        """
         super(MainWindow, self).__init__()
         self.logger = logging.getLogger(self.__class__.__name__)
         self.logger.debug('Init a %s instance' % self.__class__.__name__)
@@ -21,33 +31,25 @@ class MainWindow(QMainWindow):
         self.treemodel = QStandardItemModel()
         # 根节点
         rootItem = self.treemodel.invisibleRootItem()
-        # 一级节点
-        gp1 = QStandardItem('TG_Default')
-        gp2 = QStandardItem('TG_Test')
-        # 二级节点
-        tk11 = QStandardItem('t_任务1')
-        tk12 = QStandardItem('t_<span style="color:red;"><b>任务</b></span>task2')
-        tk13 = QStandardItem('t_资料收集333')
-        tk21 = QStandardItem('t_发送测试')
-        tk22 = QStandardItem('t_collection 1')
-
-        rootItem.appendRow(gp1)
-        rootItem.appendRow(gp2)
-        self.logger.info('tk11 index（未加入 itemmodel 前）: %s', tk11.index())
-        gp1.appendRow(tk11)
-        self.logger.info('tk11 index（加入 itemmodel 后）: %s', tk11.index())
-        gp1.appendRow(tk12)
-        gp1.appendRow(tk13)
-        gp2.appendRow(tk21)
-        gp2.appendRow(tk22)
+        tasks = []
+        for group_title, task_titles in task_groups:
+            # 一级节点
+            group = QStandardItem(group_title)
+            rootItem.appendRow(group)
+            # 二级节点
+            for title in task_titles:
+                task = QStandardItem(title)
+                if not tasks:
+                    self.logger.info('%s index（未加入 itemmodel 前）: %s', title, task.index())
+                group.appendRow(task)
+                if not tasks:
+                    self.logger.info('%s index（加入 itemmodel 后）: %s', title, task.index())
+                tasks.append(task)
 
         # 给 QTreeView 设置数据
         self.treeview.setModel(self.treemodel)
-        self.treeview.setIndexWidget(tk11.index(), TaskInfoWidget(tk11.text()))
-        self.treeview.setIndexWidget(tk12.index(), TaskInfoWidget(tk12.text()))
-        self.treeview.setIndexWidget(tk13.index(), TaskInfoWidget(tk13.text()))
-        self.treeview.setIndexWidget(tk21.index(), TaskInfoWidget(tk21.text()))
-        self.treeview.setIndexWidget(tk22.index(), TaskInfoWidget(tk22.text()))
+        for task in tasks:
+            self.treeview.setIndexWidget(task.index(), TaskInfoWidget(task.text()))
 
         # 展开所有节点
         self.treeview.expandAll()
@@ -1,31 +1,240 @@
-import logging, sys
+import logging, sys, os
 
 from PySide6 import QtCore
 from PySide6.QtWidgets import QApplication, QMainWindow, QTreeView, QLineEdit, QVBoxLayout, QWidget, \
-    QStyledItemDelegate, QAbstractItemView, QVBoxLayout
+    QStyledItemDelegate, QAbstractItemView, QVBoxLayout, QHBoxLayout, QComboBox
 from PySide6.QtGui import QStandardItemModel, QStandardItem, QIcon
 
-from mywidget import TaskInfoWidget
+from mywidget import TaskInfoWidget, paint_state_overlay
+from mymodel import DataChangedAggregator, TreeSnapshot, TaskRecord, SEARCH_ROLE, search_text, \
+    TITLE_SORT_ROLE, STATUS_SORT_ROLE, TIMESTAMP_SORT_ROLE, LOAD_ORDER_ROLE, title_sort_key
+from myfilter import ParallelFilterExecutor
+
+# 任务数据: [(任务组标题, [任务, ...]), ...]
+# 任务可以只有标题，也可以是 (任务标题, 状态, 时间戳)。状态：0 等待，1 进行中，2 完成
+TASK_GROUPS = [
+    ('TG_Default', [('t_任务1', 1, 1700000300.0),
+                    ('t_<span style="color:red;"><b>任务</b></span>task2', 0, 1700000100.0),
+                    ('t_资料收集333', 2, 1700000200.0)]),
+    ('TG_Test', [('t_发送测试', 2, 1700000400.0), ('t_collection 1', 0, 1700000000.0)]),
+]
 
 class SearchProxyModel(QtCore.QSortFilterProxyModel):
-    def __init__(self):
+    # 可以排序的字段，以及存放其排序键的 role
+    SORT_ROLES = {
+        'title': TITLE_SORT_ROLE,
+        'status': STATUS_SORT_ROLE,
+        'timestamp': TIMESTAMP_SORT_ROLE,
+    }
+
+    def __init__(self, executor: ParallelFilterExecutor = None):
+        """
+        Args:
+            executor (ParallelFilterExecutor, optional): 如果设置了 executor，搜索时先由它对各个任务组并行匹配，
+                filterAcceptsRow 直接查询匹配结果。executor 不适合匹配时（任务太少、pattern 的写法 Python re 不支持等），
+                仍然逐行用 QRegularExpression 匹配。
+        """
         super().__init__()
         self.logger = logging.getLogger(self.__class__.__name__)
         self.logger.debug('Init a %s instance' % self.__class__.__name__)
+
+        # 开启递归过滤：只要有子节点匹配，父节点就会被保留。
+        # 这样 filterAcceptsRow 只需要判断当前节点本身，不用再递归遍历整棵子树。
+        # 收到 dataChanged 时，proxy 也只会重新判断变化的行以及它们的祖先节点。
+        self.setRecursiveFilteringEnabled(True)
+
+        self.executor = executor
+        # 交给 executor 的文本快照是否需要重新提取
+        self.__snapshot_dirty = True
+        # executor 的匹配结果，每个任务组一个 bytes（每行一个字节）。None 表示没有可用的结果，需要逐行匹配
+        self.__accepted = None
+        # 正在调整 TaskItemModel 的加载顺序
+        self.__reordering = False
+        pass
+
+    def sort_by(self, field: str = None, order: QtCore.Qt.SortOrder = QtCore.Qt.SortOrder.AscendingOrder):
+        """按照 field（'title'、'status'、'timestamp'）排序。field 为 None 时恢复 source model 的顺序。
+
+        dynamicSortFilter 默认开启：之后某一行的排序键发生变化（dataChanged 带有 sortRole）时，
+        proxy 只会把这一行移动到新的位置，而不会重新排序整棵树。
+
+        proxy 只能排序已经加载的行。对于 TaskItemModel，先让它按照同样的排序键调整加载顺序，
+        使已加载的任务正好是排序后的前若干个任务，之后再加载的任务都排在它们后面。
+        """
+        role = None if field is None else self.SORT_ROLES[field]
+        model = self.sourceModel()
+        if isinstance(model, TaskItemModel):
+            # 调整加载顺序时 item 的内容与位置都会变化，此时的匹配结果已经过期。
+            # 过滤结果最后统一重新计算，中间直接接受所有行，避免用过期的结果、或者逐行重新匹配整个任务组
+            self.__reordering = True
+            try:
+                model.sort_tasks(role, order == QtCore.Qt.SortOrder.DescendingOrder)
+            finally:
+                self.__reordering = False
+            # 任务的加载顺序变了（没有加载任何任务的组不会发出信号），需要重新生成快照。
+            # 没有搜索时所有行本来就都接受，不用重新过滤
+            self.__snapshot_dirty = True
+            if self.filterRegularExpression().pattern():
+                self.setFilterRegularExpression(self.filterRegularExpression())
+
+        if role is None:
+            self.sort(-1)
+            return
+        self.setSortRole(role)
+        self.sort(0, order)
+        pass
+
+    def setSourceModel(self, model:QtCore.QAbstractItemModel):
+        old_model = self.sourceModel()
+        if old_model is not None:
+            old_model.dataChanged.disconnect(self.__on_source_data_changed)
+            old_model.rowsInserted.disconnect(self.__on_source_rows_inserted)
+            old_model.rowsRemoved.disconnect(self.__on_source_changed)
+            old_model.rowsMoved.disconnect(self.__on_source_changed)
+            old_model.modelReset.disconnect(self.__on_source_changed)
+            old_model.layoutChanged.disconnect(self.__on_source_changed)
+
+        if model is not None:
+            # 必须在 super().setSourceModel() 之前连接，保证先于 proxy 内部的重新过滤执行，
+            # 否则 proxy 会用过期的匹配结果来过滤发生变化的行
+            model.dataChanged.connect(self.__on_source_data_changed)
+            model.rowsInserted.connect(self.__on_source_rows_inserted)
+            model.rowsRemoved.connect(self.__on_source_changed)
+            model.rowsMoved.connect(self.__on_source_changed)
+            model.modelReset.connect(self.__on_source_changed)
+            model.layoutChanged.connect(self.__on_source_changed)
+
+        self.__on_source_changed()
+        super().setSourceModel(model)
+        pass
+
+    def setFilterRegularExpression(self, pattern):
+        """重写父类方法。在 proxy 重新过滤之前，先让 executor 并行算出所有任务组的匹配结果。
+
+        Args:
+            pattern (str | QtCore.QRegularExpression): 过滤条件
+        """
+        if isinstance(pattern, QtCore.QRegularExpression):
+            text = pattern.pattern()
+            ignore_case = bool(pattern.patternOptions() & QtCore.QRegularExpression.PatternOption.CaseInsensitiveOption)
+        else:
+            text = pattern
+            ignore_case = self.filterCaseSensitivity() == QtCore.Qt.CaseSensitivity.CaseInsensitive
+
+        self.__accepted = None
+        if self.executor is not None and self.sourceModel() is not None and text:
+            if self.__snapshot_dirty:
+                self.executor.set_groups(self.__extract_groups())
+                self.__snapshot_dirty = False
+            self.__accepted = self.executor.match(text, ignore_case)
+        super().setFilterRegularExpression(pattern)
+        pass
+
+    def fetchMore(self, parent:QtCore.QModelIndex):
+        """重写父类方法。QTreeView 每次重新布局（排序、layoutChanged 等）都会对所有展开并且 canFetchMore() 的节点调用 fetchMore()，
+        不管已加载部分的末尾在不在可见区域内，这样每排序一次就会多加载一页。
+        所以这里只为还没有显示任何任务的节点（比如刚展开的任务组）加载，之后的页由 fetch_next_page() 加载。"""
+        if self.rowCount(parent) == 0:
+            self.fetch_next_page(parent)
+        pass
+
+    def fetch_next_page(self, parent:QtCore.QModelIndex):
+        """加载 parent 的下一页。搜索时，直接加载到任务组中下一个匹配的任务为止，
+        否则匹配的任务可能排在很多页之后，展开任务组也看不到。"""
+        model = self.sourceModel()
+        source_parent = self.mapToSource(parent)
+        if self.filterRegularExpression().pattern() and isinstance(model, TaskItemModel) \
+                and source_parent.isValid() and not source_parent.parent().isValid():
+            group = model.itemFromIndex(source_parent)
+            row = self.__next_unloaded_match(group, source_parent.row())
+            if row is not None:
+                model.fetch_rows(group, row - group.rowCount() + model.page_size)
+                return
+        super().fetchMore(parent)
+        pass
+
+    def __next_unloaded_match(self, group, group_row:int):
+        """返回任务组 group 中下一个匹配的、还没加载的任务的行号。没有则返回 None"""
+        loaded = group.rowCount()
+        if self.__accepted is not None:
+            # 任务从第 1 行开始
+            row = self.__accepted[group_row].find(1, loaded + 1)
+            return row - 1 if row >= 0 else None
+        for offset, text in enumerate(group.unloaded_search_texts()):
+            if self.filterRegularExpression().match(text).hasMatch():
+                return loaded + offset
+        return None
+
+    def __extract_groups(self) -> list:
+        """提取每个任务组（及其任务）的搜索文本。
+        还没加载的任务使用任务组的搜索索引（见 group_item()），不需要创建这些任务。"""
+        model = self.sourceModel()
+        role = self.filterRole()
+        groups = []
+        for row in range(model.rowCount()):
+            group_idx = model.index(row, 0)
+            texts = [group_idx.data(role) or '']
+            for child_row in range(model.rowCount(group_idx)):
+                texts.append(model.index(child_row, 0, group_idx).data(role) or '')
+            group = self.group_item(group_idx)
+            if group is not None:
+                texts.extend(group.unloaded_search_texts())
+            groups.append(texts)
+        return groups
+
+    @staticmethod
+    def group_item(source_idx:QtCore.QModelIndex):
+        """返回带有搜索索引的任务组节点（完整模型的 TaskGroupItem 或者快照占位模型的 SnapshotGroupItem）。
+        source_idx 不是这样的任务组时返回 None"""
+        model = source_idx.model()
+        if isinstance(model, QStandardItemModel) and source_idx.isValid() and not source_idx.parent().isValid():
+            item = model.itemFromIndex(source_idx)
+            if isinstance(item, (TaskGroupItem, SnapshotGroupItem)):
+                return item
+        return None
+
+    def __on_source_data_changed(self, topLeft:QtCore.QModelIndex, bottomRight:QtCore.QModelIndex, roles:list = []):
+        # 只有搜索文本变化才需要丢弃匹配结果（gif 换帧只带有 DecorationRole）
+        if not roles or self.filterRole() in roles:
+            self.__on_source_changed()
+        pass
+
+    def __on_source_rows_inserted(self, parent:QtCore.QModelIndex, first:int, last:int):
+        # TaskItemModel 懒加载出来的任务本来就在搜索索引里，匹配结果仍然有效
+        model = self.sourceModel()
+        if not (isinstance(model, TaskItemModel) and model.fetching):
+            self.__on_source_changed()
+        pass
+
+    def __on_source_changed(self, *args):
+        self.__snapshot_dirty = True
+        self.__accepted = None
         pass
 
     def __accept_index(self, idx:QtCore.QModelIndex) -> bool:
         if idx.isValid():
-            text = idx.data(QtCore.Qt.ItemDataRole.DisplayRole)
+            text = idx.data(self.filterRole())
             if self.filterRegularExpression().match(text).hasMatch():
                 return True
-            # 递归对子节点进行判断
-            for row in range(idx.model().rowCount(idx)):
-                if self.__accept_index(idx.model().index(row, 0, idx)):
-                    return True
+            # 已加载的子节点交给 recursiveFilteringEnabled 处理，还没加载的子节点查询任务组的搜索索引
+            group = self.group_item(idx)
+            if group is not None:
+                for unloaded_text in group.unloaded_search_texts():
+                    if self.filterRegularExpression().match(unloaded_text).hasMatch():
+                        return True
         return False
 
     def filterAcceptsRow(self, sourceRow:int, sourceParent:QtCore.QModelIndex):
+        if self.__reordering:
+            return True
+        if self.__accepted is not None:
+            # 直接查询 executor 的匹配结果（任务组本身是第 0 行，任务从第 1 行开始）
+            if not sourceParent.isValid():
+                # 任务组本身匹配，或者有（可能还没加载的）任务匹配
+                return 1 in self.__accepted[sourceRow]
+            if not sourceParent.parent().isValid():
+                return self.__accepted[sourceParent.row()][sourceRow + 1] == 1
+
         idx = self.sourceModel().index(sourceRow, 0, sourceParent)
         if self.__accept_index(idx):
             self.logger.debug('匹配: %s', self.sourceModel().data(idx, role=QtCore.Qt.ItemDataRole.DisplayRole))
@@ -36,24 +245,301 @@ class SearchProxyModel(QtCore.QSortFilterProxyModel):
         
 class TaskInfoItem(QStandardItem):
     """表示在 Model 中的每一个 item 项"""
-    def __init__(self, title: str, description: str = '任务描述...', icon: QIcon = None):
+    def __init__(self, record: TaskRecord, description: str = '任务描述...', icon: QIcon = None,
+                 aggregator: DataChangedAggregator = None):
+        title = record.title
         super(TaskInfoItem, self).__init__(title)
         self.logger = logging.getLogger(self.__class__.__name__)
         self.logger.debug('Init a %s instance. title[%s]', self.__class__.__name__, title)
 
         self.setEditable(False)
-        
-        self.widget = TaskInfoWidget(title, description, icon)
-        self.setData(self.widget, role=QtCore.Qt.ItemDataRole.UserRole)
-        # TaskInfoWidget 必须先初始化。如果像下面这样调用 TaskInfoWidget，实际上是不会初始化 widget 实例的。🤷‍♂️
-        # self.setData(TaskInfoWidget(title, description, icon), role=QtCore.Qt.ItemDataRole.UserRole)
+        self.description = description
+        self.icon = icon
+        self.aggregator = aggregator
+
+        # TaskInfoWidget 等到第一次被绘制时才由 TaskInfoDelegate 通过 task_widget() 创建，
+        # 这样被过滤掉、或者从来没有显示过的任务不会占用 widget 与 QMovie。
+        # 注意不要为此重写 data()：排序、过滤时 C++ 会频繁调用 data()，重写之后每次都要回到 Python。
+        # 也不要把 widget 用 setData() 写回 model：task_widget() 是在绘制过程中调用的，
+        # setData() 发射的 dataChanged 会让 treeview 再算一次行高、再重绘一次。
+        self.widget = None
+        self.set_record(record)
+        pass
+
+    def set_record(self, record: TaskRecord):
+        """让 item 显示另一个任务（TaskItemModel 调整加载顺序时复用 item）。原来的 TaskInfoWidget 会被释放"""
+        self.release_widget()
+        self.record = record
+        self.setText(record.title)
+        self.setData(record.search_text, role=SEARCH_ROLE)
+        # 排序键由 TaskRecord 计算一次，排序时直接比较
+        self.setData(record.title_key, role=TITLE_SORT_ROLE)
+        self.setData(record.status, role=STATUS_SORT_ROLE)
+        self.setData(record.timestamp, role=TIMESTAMP_SORT_ROLE)
+        pass
+
+    def task_widget(self) -> TaskInfoWidget:
+        if self.widget is None:
+            self.widget = TaskInfoWidget(self.record.title, self.description, self.icon)
+            if self.widget.label_icon.movie() is not None:
+                # emitDataChanged 会触发 treeview 单独重绘制该 item（并非重绘整个 treeview）
+                self.widget.label_icon.movie().frameChanged.connect(self.on_frame_changed)
+                pass
+        return self.widget
+
+    def release_widget(self):
+        """释放 TaskInfoWidget（以及其中的 QMovie）。item 被移出 model 之前调用。
+        widget 的 QMovie 连接着 on_frame_changed，不断开的话 widget 与 item 会互相引用，谁都不会被释放"""
+        if self.widget is not None:
+            self.widget.movie.frameChanged.disconnect(self.on_frame_changed)
+            self.widget = None
+        pass
+
+    def set_status(self, status: int):
+        self.record.status = status
+        # setData 发射的 dataChanged 只带有 STATUS_SORT_ROLE，proxy 只会移动这一行。
+        # 这里不经过 aggregator，proxy 需要立即重新排序（见 DataChangedAggregator 的说明）
+        self.setData(status, role=STATUS_SORT_ROLE)
+        self.__sort_key_changed()
+        pass
+
+    def set_timestamp(self, timestamp: float):
+        self.record.timestamp = timestamp
+        self.setData(timestamp, role=TIMESTAMP_SORT_ROLE)
+        self.__sort_key_changed()
+        pass
+
+    def __sort_key_changed(self):
+        model = self.model()
+        if isinstance(model, TaskItemModel):
+            model.task_sort_key_changed(self)
+        pass
+
+    def on_frame_changed(self, frame_number: int):
+        # gif 换帧只影响图标的绘制，用 DecorationRole 作为 role 提示
+        self.emitDataChanged([QtCore.Qt.ItemDataRole.DecorationRole])
+        pass
+
+    def emitDataChanged(self, roles: list = None):
+        """重写 QStandardItem.emitDataChanged()。
+        如果设置了 aggregator，则交给 aggregator 在下一轮事件循环中合并发射，否则立即发射。
+
+        Args:
+            roles (list, optional): 发生变化的 role 列表。None 表示所有 role。
+        """
+        if self.aggregator is not None:
+            self.aggregator.post(self, roles)
+        else:
+            super().emitDataChanged()
+        pass
+
+class TaskGroupItem(QStandardItem):
+    """任务组。只保存任务的数据（TaskRecord），任务（TaskInfoItem）由 TaskItemModel 按页加载"""
+    def __init__(self, title: str, tasks: list, search_texts: list = None):
+        """
+        Args:
+            title (str): 任务组标题
+            tasks (list): 任务数据，每个任务的格式见 mymodel.task_fields()
+            search_texts (list, optional): 按 tasks 的顺序排列的搜索文本（来自启动快照的搜索索引）。
+                数量与 tasks 不一致时忽略
+        """
+        super(TaskGroupItem, self).__init__(title)
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.logger.debug('Init a %s instance. title[%s]', self.__class__.__name__, title)
+
+        self.setData(search_text(title), role=SEARCH_ROLE)
+        # 任务组只有标题排序键。按状态、时间排序时，任务组的排序键为空，保持原来的顺序
+        self.setData(title_sort_key(title), role=TITLE_SORT_ROLE)
+        # 所有任务的数据，按照加载顺序排列：前 rowCount() 个已经加载，剩下的还没有加载
+        seeded = search_texts is not None and len(search_texts) == len(tasks)
+        if not seeded:
+            search_texts = [None] * len(tasks)
+        self.tasks = [TaskRecord(index, task, text) for index, (task, text) in enumerate(zip(tasks, search_texts))]
+        # 所有任务的搜索文本，与 tasks 的顺序一致。没有快照时第一次搜索才生成
+        self.search_index = list(search_texts) if seeded else None
+        pass
+
+    def set_tasks(self, tasks: list):
+        """调整任务的加载顺序"""
+        self.tasks = tasks
+        self.search_index = None
+        pass
+
+    def unloaded_search_texts(self) -> list:
+        """返回还没有加载的任务的搜索文本"""
+        if self.search_index is None:
+            self.search_index = [record.search_text for record in self.tasks]
+        return self.search_index[self.rowCount():]
+
+class SnapshotGroupItem(QStandardItem):
+    """快照占位模型中的任务组。占位模型只有上次退出时已经加载的任务，
+    过滤时用快照中的搜索索引判断任务组是否有（还没加载的）任务匹配"""
+    def __init__(self, title: str, search_texts: list):
+        """
+        Args:
+            title (str): 任务组标题
+            search_texts (list): 任务组所有任务的搜索文本
+        """
+        super(SnapshotGroupItem, self).__init__(title)
+        self.search_texts = search_texts
+        pass
+
+    def unloaded_search_texts(self) -> list:
+        """快照中的任务是按原来的顺序保存的，分不出哪些已经加载，所以返回所有任务的搜索文本。
+        已加载的任务重复出现也没有关系：这些文本只用来判断任务组本身是否保留"""
+        return self.search_texts
+
+class TaskItemModel(QStandardItemModel):
+    """任务数据模型。
+
+    任务组的子节点不会一次性创建，而是通过 canFetchMore()/fetchMore() 在展开或滚动时按页加载。
+    hasChildren() 不需要加载子节点就能返回 True，所以 QTreeView 依然会显示展开箭头。
+    """
+    def __init__(self, task_groups: list, aggregator: DataChangedAggregator = None, page_size: int = 100,
+                 parent: QtCore.QObject = None, search_index: list = None):
+        """
+        Args:
+            task_groups (list): 任务数据 [(任务组标题, [任务标题, ...]), ...]
+            aggregator (DataChangedAggregator, optional): 传给每个 TaskInfoItem
+            page_size (int, optional): 每次 fetchMore() 加载的任务数量
+            parent (QtCore.QObject, optional): 通常是 MainWindow。model 随 parent 销毁时才会删除所有 item，
+                释放它们的 TaskInfoWidget（proxy 的 setSourceModel() 会让 Python 一直引用 model）
+            search_index (list, optional): 启动快照中的搜索索引，见 TreeSnapshot.search_index。
+                有了它就不需要逐个解析任务标题中的 HTML
+        """
+        super(TaskItemModel, self).__init__(parent)
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.logger.debug('Init a %s instance' % self.__class__.__name__)
+
+        self.aggregator = aggregator
+        self.page_size = page_size
+        # 正在 fetch_rows() 中插入任务
+        self.fetching = False
+        # 任务的加载顺序：按照 sort_role 对应的排序键排序。None 表示原来的顺序
+        self.sort_role = None
+        self.sort_descending = False
+
+        if search_index is None or len(search_index) != len(task_groups):
+            search_index = [None] * len(task_groups)
+        rootItem = self.invisibleRootItem()
+        for (group_title, tasks), search_texts in zip(task_groups, search_index):
+            rootItem.appendRow(TaskGroupItem(group_title, tasks, search_texts))
+        pass
+
+    def hasChildren(self, parent:QtCore.QModelIndex = QtCore.QModelIndex()) -> bool:
+        group = self.itemFromIndex(parent) if parent.isValid() else None
+        if isinstance(group, TaskGroupItem) and len(group.tasks) > 0:
+            return True
+        return super().hasChildren(parent)
+
+    def canFetchMore(self, parent:QtCore.QModelIndex) -> bool:
+        group = self.itemFromIndex(parent) if parent.isValid() else None
+        return isinstance(group, TaskGroupItem) and group.rowCount() < len(group.tasks)
+
+    def fetchMore(self, parent:QtCore.QModelIndex):
+        if self.canFetchMore(parent):
+            self.fetch_rows(self.itemFromIndex(parent), self.page_size)
+        pass
+
+    def fetch_rows(self, group: TaskGroupItem, count: int):
+        """给任务组 group 再加载 count 个任务"""
+        loaded = group.rowCount()
+        records = group.tasks[loaded:loaded + count]
+        if not records:
+            return
+        self.logger.debug('任务组[%s] 加载任务 %s ~ %s', group.text(), loaded, loaded + len(records) - 1)
+        self.fetching = True
+        try:
+            group.appendRows([TaskInfoItem(record, aggregator=self.aggregator) for record in records])
+        finally:
+            self.fetching = False
+        pass
 
-        if self.widget.label_icon.movie() is not None:
-            # emitDataChanged 会触发 treeview 单独重绘制该 item（并非重绘整个 treeview）
-            self.widget.label_icon.movie().frameChanged.connect(self.emitDataChanged)
-            pass
+    def sort_tasks(self, role: int = None, descending: bool = False):
+        """按照 role 对应的排序键调整每个任务组的加载顺序，role 为 None 时恢复原来的顺序。
+
+        已经加载的任务会被重新加载为排序后的前若干个任务（数量不变），
+        这样 proxy 只对已加载的任务排序，得到的也是完整排序结果的开头部分。
+        """
+        self.sort_role = role
+        self.sort_descending = descending
+        for row in range(self.rowCount()):
+            self.__reorder_group(self.item(row))
+        pass
+
+    def __reorder_group(self, group: TaskGroupItem):
+        """按照当前的排序调整 group 的加载顺序。
+
+        不能逐行取出、再加载任务：每一行都会发射一次 rowsRemoved/rowsInserted，任务组被取空时 treeview 还会 fetchMore。
+        这里已加载的任务数量保持不变：仍然在已加载部分的任务直接使用原来的 item，
+        排到后面去的任务把 item 让给新排进来的任务（set_record()），最后用 sortChildren() 一次排好，
+        整个任务组只发射一次 layoutChanged。
+        """
+        # 先恢复原来的顺序，再稳定排序：排序键相同的任务保持原来的顺序，与 proxy 的排序一致
+        tasks = sorted(group.tasks, key=lambda record: record.index)
+        if self.sort_role is not None:
+            tasks.sort(key=lambda record: record.sort_key(self.sort_role), reverse=self.sort_descending)
+        loaded = group.rowCount()
+        group.set_tasks(tasks)
+        if loaded == 0:
+            return
+
+        position = {id(record): i for i, record in enumerate(tasks)}
+        items = [group.child(row) for row in range(loaded)]
+        dropped = [item for item in items if position[id(item.record)] >= loaded]
+        loaded_records = {id(item.record) for item in items}
+        incoming = [record for record in tasks[:loaded] if id(record) not in loaded_records]
+        # 接下来的 setData 都会被 layoutChanged 覆盖，不需要逐个发射 dataChanged
+        self.blockSignals(True)
+        try:
+            for item, record in zip(dropped, incoming):
+                item.set_record(record)
+            for item in items:
+                item.setData(position[id(item.record)], LOAD_ORDER_ROLE)
+        finally:
+            self.blockSignals(False)
+
+        sort_role = self.sortRole()
+        self.setSortRole(LOAD_ORDER_ROLE)
+        group.sortChildren(0)
+        self.setSortRole(sort_role)
+        pass
+
+    def task_sort_key_changed(self, item: TaskInfoItem):
+        """已加载的任务 item 的排序键发生了变化。
+
+        proxy 会把它移动到已加载的任务中的正确位置。但是如果它现在应该排在还没加载的任务之后，
+        就把它放回还没加载的任务中（释放它的 item），等加载到那里时再重新加载出来。
+        """
+        group = item.parent()
+        if self.sort_role is None or not isinstance(group, TaskGroupItem):
+            return
+        loaded = group.rowCount()
+        if loaded >= len(group.tasks) or not self.__sorts_before(group.tasks[loaded], item.record):
+            return
+
+        item.release_widget()
+        group.takeRow(item.row())
+        tasks = group.tasks
+        tasks.remove(item.record)
+        loaded -= 1
+        # 二分查找它在还没加载的任务中的位置（排在排序键相同的任务之后）
+        low, high = loaded, len(tasks)
+        while low < high:
+            middle = (low + high) // 2
+            if self.__sorts_before(item.record, tasks[middle]):
+                high = middle
+            else:
+                low = middle + 1
+        tasks.insert(low, item.record)
+        group.set_tasks(tasks)
         pass
 
+    def __sorts_before(self, a: TaskRecord, b: TaskRecord) -> bool:
+        """按照当前的排序，a 是否排在 b 之前（排序键相同返回 False）"""
+        key_a, key_b = a.sort_key(self.sort_role), b.sort_key(self.sort_role)
+        return key_a > key_b if self.sort_descending else key_a < key_b
+
 class TaskInfoDelegate(QStyledItemDelegate):
     """docstring for TaskInfoDelegate."""
     def __init__(self, parent=None):
@@ -61,8 +547,17 @@ class TaskInfoDelegate(QStyledItemDelegate):
         
         self.logger = logging.getLogger(self.__class__.__name__)
         self.logger.debug('Init a %s instance' % self.__class__.__name__)
+        self.task_size_hint = None
         pass
 
+    def task_widget(self, index:QtCore.QModelIndex) -> TaskInfoWidget:
+        """返回 index 对应的 TaskInfoItem 的 TaskInfoWidget（还没有创建的话由 TaskInfoItem 创建）。
+        从启动快照恢复的占位节点返回 None。"""
+        if isinstance(index.model(), QtCore.QSortFilterProxyModel):
+            index = index.model().mapToSource(index)
+        item = index.model().itemFromIndex(index)
+        return item.task_widget() if isinstance(item, TaskInfoItem) else None
+
     def paint(self, painter, option, index):
         self.logger.debug('============ 开始绘制 ==============')
 
@@ -78,7 +573,10 @@ class TaskInfoDelegate(QStyledItemDelegate):
     
         # 3. 绘制二级节点
         self.logger.debug('这是二级节点（任务）')
-        task_widget = index.data(role=QtCore.Qt.ItemDataRole.UserRole)
+        task_widget = self.task_widget(index)
+        if task_widget is None:
+            # 从启动快照恢复的占位节点，还没有 TaskInfoWidget
+            return super().paint(painter, option, index)
         task_widget.setGeometry(option.rect) 
             # 设置 task_widget 相对于其父亲 widget 的位置与矩形。
             # （在这里不设置也行，因为此时的 widget 是没有 parent 的）
@@ -93,14 +591,22 @@ class TaskInfoDelegate(QStyledItemDelegate):
 
         ## workaround-1
         ## 提前 translate 坐标系，似乎可以修复这个问题。
-        painter.translate(option.rect.topLeft())
-        task_widget.render(painter, QtCore.QPoint(0, 0))
+        # painter.translate(option.rect.topLeft())
+        # task_widget.render(painter, QtCore.QPoint(0, 0))
 
         ## workaround-2
         ## 加上目标 widget 原点相对于窗口原点的位置。
         # offset = option.widget.mapTo(option.widget.window(), QtCore.QPoint(0, 0))
         # self.logger.debug('QTreeView.viewport() 原点相对于窗口坐标原点的 offset: %s', offset)
         # task_widget.render(painter, option.rect.topLeft() + offset)
+
+        ## 但是每次 paint 都 render 一遍 widget 太浪费了：鼠标悬停、选中、焦点变化都会触发 paint，而 widget 的内容并没有变。
+        ## 所以分成两层绘制：
+        ## 3.1 静态层：widget 渲染好的 QPixmap，只有在 gif 换帧等内容变化时才重新渲染
+        dpr = option.widget.devicePixelRatioF() if option.widget is not None else 1.0
+        painter.drawPixmap(option.rect.topLeft(), task_widget.cached_pixmap(option.rect.size(), dpr))
+        ## 3.2 状态层：悬停、选中、焦点
+        paint_state_overlay(painter, option)
         
         painter.restore()
         pass
@@ -114,45 +620,50 @@ class TaskInfoDelegate(QStyledItemDelegate):
         
         # 如果是二级节点，返回自定义 widget 的 sizeHint
         self.logger.debug('二级节点: %s', index.data())
-        task_widget = index.data(role=QtCore.Qt.ItemDataRole.UserRole)
-        return task_widget.sizeHint()
+        # 所有任务的 TaskInfoWidget 大小都一样。缓存第一个 widget 的 sizeHint，
+        # 避免 QTreeView 为了计算行高而创建所有任务的 widget
+        if self.task_size_hint is not None and index.data(role=QtCore.Qt.ItemDataRole.SizeHintRole) is None:
+            return self.task_size_hint
+        task_widget = self.task_widget(index)
+        if task_widget is None:
+            # 占位节点的行高保存在 SizeHintRole 里
+            return super().sizeHint(option, index)
+        self.task_size_hint = task_widget.sizeHint()
+        return self.task_size_hint
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, task_groups: list = TASK_GROUPS, snapshot_path: str = None):
+        """
+        Args:
+            task_groups (list, optional): 任务数据 [(任务组标题, [任务标题, ...]), ...]
+            snapshot_path (str, optional): 启动快照文件路径。默认保存在系统的缓存目录下。
+        """
         super(MainWindow, self).__init__()
         self.logger = logging.getLogger(self.__class__.__name__)
         self.logger.debug('Init a %s instance' % self.__class__.__name__)
 
+        self.task_groups = task_groups
+        if snapshot_path is None:
+            cache_dir = QtCore.QStandardPaths.writableLocation(QtCore.QStandardPaths.StandardLocation.CacheLocation)
+            QtCore.QDir().mkpath(cache_dir)
+            snapshot_path = os.path.join(cache_dir, 'tv2_snapshot.bin')
+        self.snapshot_path = snapshot_path
+        # 完整的数据模型，由 load_tasks() 创建
+        self.treemodel = None
+
         self.treeview = QTreeView()
         self.treeview.setHeaderHidden(True)
         self.treeview.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
-        
-        # 定义数据
-        self.treemodel = QStandardItemModel()
-        # 根节点
-        rootItem = self.treemodel.invisibleRootItem()
-        # 一级节点
-        gp1 = QStandardItem('TG_Default')
-        gp2 = QStandardItem('TG_Test')
-        # 二级节点
-        tk11 = TaskInfoItem('t_任务1')
-        tk12 = TaskInfoItem('t_<span style="color:red;"><b>任务</b></span>task2')
-        tk13 = TaskInfoItem('t_资料收集333')
-        tk21 = TaskInfoItem('t_发送测试')
-        tk22 = TaskInfoItem('t_collection 1')
-
-        rootItem.appendRow(gp1)
-        rootItem.appendRow(gp2)
-        gp1.appendRow(tk11)
-        gp1.appendRow(tk12)
-        gp1.appendRow(tk13)
-        gp2.appendRow(tk21)
-        gp2.appendRow(tk22)
-
-        # 定义 ProxyModel
-        self.proxymodel = SearchProxyModel()
-        self.proxymodel.setSourceModel(self.treemodel)
+
+        # 合并所有 item 的 dataChanged 信号
+        self.aggregator = DataChangedAggregator(self)
+
+        # 定义 ProxyModel（任务数量很多时，搜索由 filter_executor 在多个进程中并行匹配）
+        self.filter_executor = ParallelFilterExecutor()
+        self.proxymodel = SearchProxyModel(self.filter_executor)
         self.proxymodel.setFilterCaseSensitivity(QtCore.Qt.CaseSensitivity.CaseInsensitive)
+        # 使用去掉 HTML 标签后的纯文本进行搜索
+        self.proxymodel.setFilterRole(SEARCH_ROLE)
 
         # 给 QTreeView 设置数据
         self.treeview.setModel(self.proxymodel)
@@ -160,25 +671,175 @@ class MainWindow(QMainWindow):
         # 给 QTreeView 设置自定义的 ItemDelegate
         delegate = TaskInfoDelegate()
         self.treeview.setItemDelegate(delegate)
-        # 展开所有节点
-        self.treeview.expandAll()
 
         # 搜索栏
         self.ui_search = QLineEdit()
         self.ui_search.setPlaceholderText('Search...')
         self.ui_search.textChanged.connect(self.on_search_text_changed)
 
+        # 排序方式
+        self.ui_sort = QComboBox()
+        self.ui_sort.addItem('No sorting', None)
+        self.ui_sort.addItem('Title', 'title')
+        self.ui_sort.addItem('Status', 'status')
+        self.ui_sort.addItem('Timestamp', 'timestamp')
+        self.ui_sort.currentIndexChanged.connect(self.on_sort_changed)
+
+        # 任务组已加载的最后一个任务滚动到可见区域时，加载更多任务
+        self.treeview.verticalScrollBar().valueChanged.connect(self.on_scroll_value_changed)
+
+        top_layout = QHBoxLayout()
+        top_layout.addWidget(self.ui_search)
+        top_layout.addWidget(self.ui_sort)
+
         main_layout = QVBoxLayout()
-        main_layout.addWidget(self.ui_search)
+        main_layout.addLayout(top_layout)
         main_layout.addWidget(self.treeview)
         widget = QWidget()
         widget.setLayout(main_layout)
         self.setCentralWidget(widget)
 
+        # 如果启动快照有效，先用快照立即显示上一次的视图，完整数据等到快照第一次绘制出来之后再加载。
+        # 注意不能直接用 0 毫秒的定时器：它会在窗口第一次绘制之前就触发，快照根本不会显示出来。
+        snapshot = TreeSnapshot.load(self.snapshot_path)
+        if snapshot is not None and snapshot.content_hash != TreeSnapshot.hash_of(self.task_groups):
+            snapshot = None
+        # 完整模型使用快照中的搜索索引
+        self.snapshot = snapshot
+        if snapshot is not None:
+            self.restore_snapshot(snapshot)
+            self.treeview.viewport().installEventFilter(self)
+        else:
+            self.load_tasks()
+
+    def eventFilter(self, watched, event):
+        if watched is self.treeview.viewport() and event.type() == QtCore.QEvent.Type.Paint:
+            # 只需要第一次绘制
+            watched.removeEventFilter(self)
+            # 这次绘制的是快照的占位模型。定时器在本次绘制结束之后才会触发，再加载完整数据
+            QtCore.QTimer.singleShot(0, self.load_tasks)
+        return super().eventFilter(watched, event)
+
+    def load_tasks(self):
+        """根据 self.task_groups 创建完整的数据模型"""
+        # 记住当前的展开状态（恢复快照后用户可能已经展开/折叠过任务组）
+        placeholder = self.proxymodel.sourceModel()
+        expanded = self.expanded_groups() if placeholder is not None else None
+
+        # 定义数据（任务在展开或滚动时才按页创建）
+        search_index = self.snapshot.search_index if self.snapshot is not None else None
+        self.treemodel = TaskItemModel(self.task_groups, self.aggregator, parent=self, search_index=search_index)
+        self.snapshot = None
+
+        self.proxymodel.setSourceModel(self.treemodel)
+        if placeholder is not None:
+            placeholder.deleteLater()
+        # 恢复快照之后用户可能已经选择了排序方式
+        self.proxymodel.sort_by(self.ui_sort.currentData())
+        if expanded is None:
+            # 展开所有节点
+            self.treeview.expandAll()
+        else:
+            self.expand_groups(expanded)
+        pass
+
+    def restore_snapshot(self, snapshot: TreeSnapshot):
+        """用启动快照创建一个只有文字的占位模型，并恢复搜索栏与展开状态。"""
+        model = QStandardItemModel(self)
+        parents = [model.invisibleRootItem()]
+        group_count = 0
+        for depth, title, text, height in snapshot.rows:
+            # 任务的标题可能带有 HTML 标签，完整模型中由 TaskInfoWidget 渲染。占位节点由默认的 delegate 绘制，
+            # 所以显示去掉标签后的纯文本。任务组本来就由默认的 delegate 绘制，显示原来的标题（展开状态也按标题记录）
+            if depth == 0:
+                search_texts = snapshot.search_index[group_count] if group_count < len(snapshot.search_index) else []
+                item = SnapshotGroupItem(title, search_texts)
+                group_count += 1
+            else:
+                item = QStandardItem(text)
+            item.setData(text, role=SEARCH_ROLE)
+            if height > 0:
+                item.setData(QtCore.QSize(0, height), role=QtCore.Qt.ItemDataRole.SizeHintRole)
+            del parents[depth + 1:]
+            parents[depth].appendRow(item)
+            parents.append(item)
+
+        self.proxymodel.setSourceModel(model)
+        self.ui_search.blockSignals(True)
+        self.ui_search.setText(snapshot.filter_text)
+        self.ui_search.blockSignals(False)
+        self.proxymodel.setFilterRegularExpression(snapshot.filter_text)
+        self.expand_groups(snapshot.expanded)
+        pass
+
+    def take_snapshot(self) -> TreeSnapshot:
+        """把当前的任务树、搜索栏与展开状态保存为启动快照。任务组的行高记为 -1（使用默认行高）。
+        任务树只保存已经加载的任务，搜索索引则包括每个任务组的所有任务（按任务原来的顺序）"""
+        rows = []
+        search_index = []
+        root = self.treemodel.invisibleRootItem()
+        for group_row in range(root.rowCount()):
+            group = root.child(group_row)
+            rows.append((0, group.text(), group.data(SEARCH_ROLE), -1))
+            for task_row in range(group.rowCount()):
+                task = group.child(task_row)
+                height = task.widget.sizeHint().height() if task.widget is not None else -1
+                rows.append((1, task.text(), task.data(SEARCH_ROLE), height))
+            search_index.append([record.search_text for record in sorted(group.tasks, key=lambda record: record.index)])
+        return TreeSnapshot(TreeSnapshot.hash_of(self.task_groups), rows, self.ui_search.text(), self.expanded_groups(),
+                            search_index)
+
+    def expanded_groups(self) -> list:
+        """返回所有展开的任务组标题"""
+        titles = []
+        for row in range(self.proxymodel.rowCount()):
+            idx = self.proxymodel.index(row, 0)
+            if self.treeview.isExpanded(idx):
+                titles.append(idx.data())
+        return titles
+
+    def expand_groups(self, titles: list):
+        titles = set(titles)
+        for row in range(self.proxymodel.rowCount()):
+            idx = self.proxymodel.index(row, 0)
+            self.treeview.setExpanded(idx, idx.data() in titles)
+        pass
+
     def on_search_text_changed(self, text):
         self.logger.debug('search text changed: %s', text)
         self.proxymodel.setFilterRegularExpression(self.ui_search.text())
-        self.treeview.expandAll()
+        # 只需要展开任务组。expandAll() 还会检查每个已加载的任务有没有子节点
+        self.treeview.expandToDepth(0)
+        pass
+
+    def on_sort_changed(self, index):
+        self.logger.debug('sort changed: %s', self.ui_sort.itemData(index))
+        self.proxymodel.sort_by(self.ui_sort.itemData(index))
+        pass
+
+    def on_scroll_value_changed(self, value):
+        self.fetch_visible_groups()
+        pass
+
+    def fetch_visible_groups(self):
+        """QTreeView 只会对根节点、以及刚展开的节点自动 fetchMore。
+        任何一个任务组已加载的最后一个任务进入可见区域时（不一定在视图底部，也不一定是最后一个任务组），
+        都需要手动加载该任务组的下一页"""
+        height = self.treeview.viewport().height()
+        idx = self.treeview.indexAt(QtCore.QPoint(0, 0))
+        while idx.isValid() and self.treeview.visualRect(idx).top() < height:
+            parent = idx.parent()
+            if parent.isValid() and idx.row() == self.proxymodel.rowCount(parent) - 1 \
+                    and self.proxymodel.canFetchMore(parent):
+                self.proxymodel.fetch_next_page(parent)
+            idx = self.treeview.indexBelow(idx)
+        pass
+
+    def closeEvent(self, event):
+        if self.treemodel is not None:
+            self.take_snapshot().save(self.snapshot_path)
+        self.filter_executor.shutdown()
+        super().closeEvent(event)
         pass
 
 def main():
@@ -5,7 +5,13 @@ from PySide6.QtWidgets import QApplication, QMainWindow, QTreeView, QLineEdit, Q
     QStyledItemDelegate, QAbstractItemView, QVBoxLayout, QStyle
 from PySide6.QtGui import QStandardItemModel, QStandardItem, QIcon
 
-from mywidget import TaskInfoWidget
+from mywidget import TaskInfoWidget, paint_state_overlay
+
+# 任务数据: [(任务组标题, [任务标题, ...]), ...]
+TASK_GROUPS = [
+    ('TG_Default', ['t_任务1', 't_<span style="color:red;"><b>任务</b></span>task2', 't_资料收集333']),
+    ('TG_Test', ['t_发送测试', 't_collection 1']),
+]
 
 #############################
 # Don't take this method!
@@ -90,8 +96,10 @@ class TaskInfoDelegate(QStyledItemDelegate):
         #     task_widget.first_paint = False
 
         painter.save()
-        painter.translate(option.rect.topLeft())
-        task_widget.render(painter, QtCore.QPoint(0, 0))
+        # 静态层（缓存的 widget 渲染结果）+ 状态层（悬停、选中、焦点），悬停时不需要重新 render widget
+        dpr = option.widget.devicePixelRatioF() if option.widget is not None else 1.0
+        painter.drawPixmap(option.rect.topLeft(), task_widget.cached_pixmap(option.rect.size(), dpr))
+        paint_state_overlay(painter, option)
         painter.restore()
         pass
 
@@ -108,7 +116,11 @@ class TaskInfoDelegate(QStyledItemDelegate):
         return task_widget.sizeHint()
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, task_groups: list = TASK_GROUPS):
+        """
+        Args:
+            task_groups (list, optional): 任务数据 [(任务组标题, [任务标题, ...]), ...]
+        """
         super(MainWindow, self).__init__()
         self.logger = logging.getLogger(self.__class__.__name__)
         self.logger.debug('Init a %s instance' % self.__class__.__name__)
@@ -118,26 +130,16 @@ class MainWindow(QMainWindow):
         self.treeview.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
         
         # 定义数据
-        self.treemodel = QStandardItemModel()
+        self.treemodel = QStandardItemModel(self)
         # 根节点
         rootItem = self.treemodel.invisibleRootItem()
-        # 一级节点
-        gp1 = QStandardItem('TG_Default')
-        gp2 = QStandardItem('TG_Test')
-        # 二级节点
-        tk11 = TaskInfoItem('t_任务1')
-        tk12 = TaskInfoItem('t_<span style="color:red;"><b>任务</b></span>task2')
-        tk13 = TaskInfoItem('t_资料收集333')
-        tk21 = TaskInfoItem('t_发送测试')
-        tk22 = TaskInfoItem('t_collection 1')
-
-        rootItem.appendRow(gp1)
-        rootItem.appendRow(gp2)
-        gp1.appendRow(tk11)
-        gp1.appendRow(tk12)
-        gp1.appendRow(tk13)
-        gp2.appendRow(tk21)
-        gp2.appendRow(tk22)
+        for group_title, task_titles in task_groups:
+            # 一级节点
+            group = QStandardItem(group_title)
+            rootItem.appendRow(group)
+            # 二级节点
+            for title in task_titles:
+                group.appendRow(TaskInfoItem(title))
 
         # 定义 ProxyModel
         self.proxymodel = SearchProxyModel()
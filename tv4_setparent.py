@@ -7,6 +7,12 @@ from PySide6.QtGui import QStandardItemModel, QStandardItem, QIcon
 
 from mywidget import TaskInfoWidget
 
+# 任务数据: [(任务组标题, [任务标题, ...]), ...]
+TASK_GROUPS = [
+    ('TG_Default', ['t_任务1', 't_<span style="color:red;"><b>任务</b></span>task2', 't_资料收集333']),
+    ('TG_Test', ['t_发送测试', 't_collection 1']),
+]
+
 class SearchProxyModel(QtCore.QSortFilterProxyModel):
     def __init__(self):
         super().__init__()
@@ -28,8 +34,7 @@ class SearchProxyModel(QtCore.QSortFilterProxyModel):
             text = idx.data(QtCore.Qt.ItemDataRole.DisplayRole)
             tw = idx.data(role=QtCore.Qt.ItemDataRole.UserRole)
             if self.filterRegularExpression().match(text).hasMatch():
-                if tw is not None:
-                    tw.setVisible(True)
+                # 匹配的 widget 等到 delegate 把它摆到任务行上时再显示
                 return True
             else:
                 if tw is not None:
@@ -114,6 +119,9 @@ class TaskInfoDelegate(QStyledItemDelegate):
         self.logger.debug('这是二级节点（任务）')
         task_widget = index.data(role=QtCore.Qt.ItemDataRole.UserRole)
         task_widget.setGeometry(option.rect)
+        if task_widget.isHidden():
+            # 第一次被摆到任务行上，才显示出来
+            task_widget.show()
         # 由于设置了 task_widget 的父 widget 是 treeview。
         # 所以必须设置 task_widget 相对于其父 widget 的位置与矩形。由 tlw > parent widget > child widget 这样的绘制链自动绘制。
         # 因此，我们也就不需要在此主动调用 task_widget.render() 进行手工绘制了。
@@ -132,7 +140,11 @@ class TaskInfoDelegate(QStyledItemDelegate):
         return task_widget.sizeHint()
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, task_groups: list = TASK_GROUPS):
+        """
+        Args:
+            task_groups (list, optional): 任务数据 [(任务组标题, [任务标题, ...]), ...]
+        """
         super(MainWindow, self).__init__()
         self.logger = logging.getLogger(self.__class__.__name__)
         self.logger.debug('Init a %s instance' % self.__class__.__name__)
@@ -145,29 +157,17 @@ class MainWindow(QMainWindow):
         self.treemodel = QStandardItemModel()
         # 根节点
         rootItem = self.treemodel.invisibleRootItem()
-        # 一级节点
-        gp1 = QStandardItem('TG_Default')
-        gp2 = QStandardItem('TG_Test')
-        # 二级节点
-        tk11 = TaskInfoItem('t_任务1')
-        tk12 = TaskInfoItem('t_<span style="color:red;"><b>任务</b></span>task2')
-        tk13 = TaskInfoItem('t_资料收集333')
-        tk21 = TaskInfoItem('t_发送测试')
-        tk22 = TaskInfoItem('t_collection 1')
-
-        rootItem.appendRow(gp1)
-        rootItem.appendRow(gp2)
-        gp1.appendRow(tk11)
-        gp1.appendRow(tk12)
-        gp1.appendRow(tk13)
-        gp2.appendRow(tk21)
-        gp2.appendRow(tk22)
-
-        tk11.widget.setParent(self.treeview.viewport())
-        tk12.widget.setParent(self.treeview.viewport())
-        tk13.widget.setParent(self.treeview.viewport())
-        tk21.widget.setParent(self.treeview.viewport())
-        tk22.widget.setParent(self.treeview.viewport())
+        for group_title, task_titles in task_groups:
+            # 一级节点
+            group = QStandardItem(group_title)
+            rootItem.appendRow(group)
+            # 二级节点
+            for title in task_titles:
+                task = TaskInfoItem(title)
+                group.appendRow(task)
+                task.widget.setParent(self.treeview.viewport())
+                # 还没有被 delegate 摆到任务行上的 widget 先隐藏，否则它们都会叠在 viewport 的左上角显示（并且一直播放 gif）
+                task.widget.hide()
 
         # 定义 ProxyModel
         self.proxymodel = SearchProxyModel()